@@ -0,0 +1,302 @@
+import asyncio
+import os
+import re
+
+from playwright.async_api import async_playwright
+
+from readiness import (
+    CHART_LEGEND_READY_JS,
+    QUARTERLY_SHP_READY_JS,
+    WAIT_STATS,
+    async_wait_until,
+)
+from results_scraper import (
+    parse_promoters_last2,
+    parse_quarterly_financials,
+    parse_recent_borrowings,
+    parse_recent_cash_from_ops,
+    parse_recent_working_capital_days,
+    parse_top_ratios,
+    CHART_FETCH_JS,
+    WAREHOUSE_ID_JS,
+    chart_api_url,
+    company_code_from_url,
+    median_pe_from_chart,
+    publish_result,
+)
+from sinks import close_sinks
+
+# asyncio port of results_scraper: one event loop drives many tabs of a
+# single browser. Every extractor reads its section with one evaluate call
+# and reuses the plain-list parsers from results_scraper, and the
+# independent sections of a page are gathered concurrently.
+
+# Rows of every table inside a section, as lists of cell texts.
+SECTION_ROWS_JS = """
+(section) => {
+    const rows = [];
+    section.querySelectorAll("table").forEach((tbl) => {
+        tbl.querySelectorAll("tr").forEach((tr) => {
+            const cells = Array.from(tr.querySelectorAll("td, th")).map(
+                (c) => (c.innerText || c.textContent || "").trim());
+            if (cells.length) rows.push(cells);
+        });
+    });
+    return rows;
+}
+"""
+
+
+async def _section_rows(page, selector, timeout=10000):
+    await page.wait_for_selector(selector, timeout=timeout)
+    section = await page.query_selector(selector)
+    if not section:
+        return None
+    return await section.evaluate(SECTION_ROWS_JS)
+
+
+# ---------- Section extractors ----------
+
+async def extract_quarterly_financials(page):
+    """Extract last 5 quarters of Sales, Other Income, OPM%, Net Profit from the Quarters section."""
+    return parse_quarterly_financials(await _section_rows(page, "section#quarters"))
+
+
+async def extract_recent_borrowings(page):
+    """Borrowings from the Balance Sheet section, [older, newer]."""
+    return parse_recent_borrowings(await _section_rows(page, "section#balance-sheet"))
+
+
+async def extract_recent_cash_from_ops(page):
+    """'Cash from Operating Activity' from the Cash Flow section, [older, newer]."""
+    return parse_recent_cash_from_ops(await _section_rows(page, "section#cash-flow"))
+
+
+async def extract_recent_working_capital_days(page):
+    """'Working Capital Days' from the Ratios section, [latest, prev]."""
+    try:
+        rows = await _section_rows(page, "section#ratios")
+    except Exception:
+        return [None, None]
+    return parse_recent_working_capital_days(rows)
+
+
+async def extract_marketcap_stockpe_industrype(page):
+    """Market Cap, Stock PE, Industry PE from the top ratios block."""
+    ratios_text, items = await page.evaluate(
+        """() => {
+            const div = document.querySelector("#top > div.company-info > div.company-ratios");
+            const list = document.querySelector("#top-ratios");
+            return [
+                div ? div.innerText : null,
+                list ? Array.from(list.querySelectorAll("li")).map((li) => li.innerText) : [],
+            ];
+        }"""
+    )
+    return parse_top_ratios(ratios_text, items)
+
+
+async def extract_promoters_last2(page):
+    """Last 2 promoter shareholding % from Shareholding Pattern → Quarterly, [prev, curr]."""
+    try:
+        await page.wait_for_selector("section#shareholding", timeout=10000)
+    except Exception:
+        return [None, None]
+
+    section = await page.query_selector("section#shareholding")
+    if not section:
+        return [None, None]
+
+    # Ensure we are on quarterly tab
+    if not await section.query_selector('button.active[data-tab-id="quarterly-shp"]'):
+        try:
+            await (await section.query_selector('button[data-tab-id="quarterly-shp"]')).click()
+            await async_wait_until(page, "shareholding tab", js=QUARTERLY_SHP_READY_JS, timeout=5000)
+        except Exception:
+            pass
+
+    rows = await section.evaluate(
+        """(section) => {
+            const table = section.querySelector("#quarterly-shp table.data-table");
+            if (!table) return null;
+            return Array.from(table.querySelectorAll("tbody tr")).map(
+                (tr) => Array.from(tr.querySelectorAll("td")).map((td) => td.innerText.trim()));
+        }"""
+    )
+    return parse_promoters_last2(rows)
+
+
+async def fetch_median_pe(page):
+    """Median PE from the chart data endpoint, fetched from inside `page`; None if unavailable."""
+    try:
+        warehouse_id = await page.evaluate(WAREHOUSE_ID_JS)
+        if not warehouse_id:
+            return None
+        data = await page.evaluate(CHART_FETCH_JS, chart_api_url(page.url, warehouse_id))
+    except Exception as e:
+        print("Chart data fetch failed:", e)
+        return None
+    return median_pe_from_chart(data)
+
+
+async def extract_median_pe(page):
+    """Navigate to Charts, PE Ratio, then extract the Median PE from the bottom of the graph."""
+    try:
+        await page.click('text="Chart"')
+    except Exception:
+        return None
+
+    if not await async_wait_until(page, "chart metrics", selector="#company-chart-metrics",
+                                  timeout=5000):
+        return None
+
+    try:
+        pe_button = await page.query_selector('button:has-text("PE")')
+        if not pe_button:
+            pe_button = await page.query_selector('button:has-text("PE Ratio")')
+
+        if pe_button:
+            await pe_button.click()
+        else:
+            for btn in await page.query_selector_all("#company-chart-metrics button"):
+                if "pe" in (await btn.inner_text()).lower():
+                    await btn.click()
+                    break
+    except Exception:
+        pass
+
+    if not await async_wait_until(page, "chart legend", js=CHART_LEGEND_READY_JS):
+        return None
+
+    median_pe = None
+    for label in await page.query_selector_all("#chart-legend > label"):
+        txt = await label.inner_text()
+        if "median" in txt.lower() and "pe" in txt.lower():
+            match = re.search(r"(\d+[.,]?\d*)", txt)
+            if match:
+                try:
+                    median_pe = float(match.group(1).replace(",", ""))
+                except ValueError:
+                    pass
+            break
+
+    return median_pe
+
+
+# ---------- MAIN SCRAPER FUNCTION (async) ----------
+
+async def scrape_page(page):
+    """Scrape every metric of a company page into the result dict, without publishing it."""
+    base_url = page.url.split("#")[0].rstrip("/")
+    quarters_url = f"{base_url}/#quarters"
+    if page.url != quarters_url:
+        await page.goto(quarters_url)
+        await page.wait_for_load_state("networkidle")
+
+    (
+        quarterly,
+        borrowings,
+        cash_from_ops,
+        wc_days,
+        prom_last2,
+        (marketcap, stock_pe, industry_pe),
+    ) = await asyncio.gather(
+        extract_quarterly_financials(page),
+        extract_recent_borrowings(page),
+        extract_recent_cash_from_ops(page),
+        extract_recent_working_capital_days(page),
+        extract_promoters_last2(page),
+        extract_marketcap_stockpe_industrype(page),
+    )
+
+    # Fallback to Median PE if Industry PE missing
+    median_pe = None
+    if industry_pe is None:
+        median_pe = await fetch_median_pe(page)
+        if median_pe is None:
+            median_pe = await extract_median_pe(page)
+
+    return {
+        **quarterly,
+        "borrowings": borrowings,
+        "cash_from_ops": cash_from_ops,
+        "working_capital_days": wc_days,
+        "marketcap": marketcap,
+        "stock_pe": stock_pe,
+        "industry_pe": industry_pe,
+        "median_pe": median_pe,
+        "promoters_last2": prom_last2,
+    }
+
+
+async def results_page_scraper(page, stock_name=None, trade_date_str=None):
+    """
+    Async counterpart of results_scraper.results_page_scraper. The section
+    extractors run concurrently with asyncio.gather; the Sheets write runs in
+    a thread so it never blocks the event loop.
+    """
+    result = await scrape_page(page)
+    if stock_name is None and trade_date_str is not None:
+        stock_name = await page.title()
+    return await asyncio.to_thread(
+        publish_result, result, stock_name, trade_date_str, company_code_from_url(page.url))
+
+
+async def scrape_many(context, jobs, tabs=10):
+    """
+    Scrape `jobs` (dicts with "url" and optional "name", "trade_date") through
+    `tabs` concurrently open pages of one browser context. Sheets writes are
+    serialized. Returns [(job, result or None), ...] in job order.
+    """
+    job_queue = asyncio.Queue()
+    for index, job in enumerate(jobs):
+        job_queue.put_nowait((index, job))
+
+    results = [None] * len(jobs)
+    write_lock = asyncio.Lock()
+
+    async def tab_worker():
+        page = await context.new_page()
+        try:
+            while not job_queue.empty():
+                index, job = job_queue.get_nowait()
+                try:
+                    await page.goto(job["url"])
+                    await page.wait_for_load_state("networkidle")
+                    result = await scrape_page(page)
+                    # Named after the page title, like every other engine
+                    name = await page.title() or job.get("name")
+                    async with write_lock:
+                        await asyncio.to_thread(
+                            publish_result, result, name, job.get("trade_date"),
+                            company_code_from_url(job["url"]))
+                    results[index] = (job, result)
+                except Exception as e:
+                    print(f"⚠ failed {job['url']}: {e}")
+                    results[index] = (job, None)
+        finally:
+            await page.close()
+
+    await asyncio.gather(*(tab_worker() for _ in range(min(tabs, len(jobs)))))
+    return results
+
+
+# ---------- Standalone debug harness ----------
+
+async def _main():
+    async with async_playwright() as p:
+        user_data_dir = os.path.join(os.getcwd(), "user_data")
+        context = await p.chromium.launch_persistent_context(user_data_dir, headless=True)
+        page = await context.new_page()
+        await page.goto("https://www.screener.in/company/531802/#quarters")
+        await page.wait_for_load_state("networkidle")
+
+        await results_page_scraper(page)
+
+        await context.close()
+    close_sinks()
+    WAIT_STATS.report()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+
+from browser_session import BrowserSession
+from listing import ANCHORS_JS, harvest_listing_parallel
+from metrics import span
+from readiness import wait_for_listing_rows, wait_for_results_nav
+from sinks import trade_day
+
+# Multi-day backfill: enumerate the results days of every month listed on
+# /results/latest/, keep the ones inside a date range, harvest each day's
+# listing and scrape all companies through one shared worker pool.
+#
+# A company listed on several days is scraped once, for the latest of them:
+# its page only shows the current figures anyway.
+
+RESULTS_URL = "https://www.screener.in/results/latest/"
+# Month links on /results/latest/, day links once a month is open
+NAV_LINK_XPATH = "/html/body/div/div[2]/main/div[1]/nav/a"
+
+
+def _link_date(text, today):
+    """'14 November' -> date, in the latest year that isn't in the future."""
+    return trade_day(text, today)
+
+
+def _month_overlaps(text, start, end, today):
+    """False only when `text` is a month name entirely outside [start, end]."""
+    try:
+        month = datetime.strptime(text.strip(), "%B").month
+    except ValueError:
+        return True
+    year = today.year if month <= today.month else today.year - 1
+    first = date(year, month, 1)
+    last = date(year + month // 12, month % 12 + 1, 1)
+    return first <= end and last > start
+
+
+def enumerate_result_days(page, start, end):
+    """
+    [(date, day_text, url), ...] of every results day between `start` and
+    `end` (inclusive), newest first.
+    """
+    today = date.today()
+    page.goto(RESULTS_URL)
+    wait_for_results_nav(page)
+    months = page.evaluate(ANCHORS_JS, NAV_LINK_XPATH)
+
+    days = {}
+    for month in months:
+        if not _month_overlaps(month["text"], start, end, today):
+            continue
+        page.goto(month["url"])
+        wait_for_results_nav(page)
+        for link in page.evaluate(ANCHORS_JS, NAV_LINK_XPATH):
+            day = _link_date(link["text"], today)
+            if day is not None and start <= day <= end:
+                days[day] = (day, link["text"], link["url"])
+    return sorted(days.values(), reverse=True)
+
+
+def previous_result_day(page, day, lookback_days=62):
+    """
+    (date, day_text, url) of the last results day before `day`, looking
+    back up to `lookback_days` (and so across month links); None if none.
+    """
+    days = enumerate_result_days(page, day - timedelta(days=lookback_days),
+                                 day - timedelta(days=1))
+    return days[0] if days else None
+
+
+def collect_backfill_jobs(page, start, end):
+    """Jobs for every company of every results day in [start, end], deduplicated across days."""
+    jobs = []
+    seen = set()
+    for day, day_text, url in enumerate_result_days(page, start, end):
+        page.goto(url)
+        if not wait_for_listing_rows(page):
+            print(f"{day_text}: no listing rows, skipped")
+            continue
+        with span("listing_harvest", trade_date=day_text):
+            day_jobs = harvest_listing_parallel(page, day_text)
+        new = [job for job in day_jobs if job["code"] not in seen]
+        seen.update(job["code"] for job in new)
+        jobs.extend(new)
+        print(f"{day_text}: {len(day_jobs)} companies, {len(new)} not seen on a later day")
+    return jobs
+
+
+def run_backfill(playwright, start, end, workers=4, min_interval=1.0, cache=None,
+                 setup_context=None, ledger=None, history=False):
+    """Scrape every results day between `start` and `end` through one worker pool."""
+    from worker_pool import scrape_with_pool
+
+    session = BrowserSession(playwright, headless=False, setup_context=setup_context).start()
+    jobs = collect_backfill_jobs(session.acquire(), start, end)
+    storage_state = session.context.storage_state()
+    session.close()
+
+    print(f"Backfill {start} .. {end}: {len(jobs)} companies; scraping with {workers} workers.")
+    return scrape_with_pool(
+        jobs,
+        workers=workers,
+        min_interval=min_interval,
+        storage_state=storage_state,
+        cache=cache,
+        setup_context=setup_context,
+        ledger=ledger,
+        history=history,
+    )
@@ -0,0 +1,188 @@
+import numpy as np
+
+from results_scraper import opm_to_float
+from rules import DEFAULT_RULES
+
+# Vectorized classification of many results at once. The scraped series are
+# packed into aligned float arrays (N stocks x 5 quarters, right-aligned so
+# the last column is the current quarter, NaN where missing) and the filters,
+# result type, valuation band and trend comments of
+# results_scraper.classify_result are computed column-wise:
+#
+#   rows = classify_batch(results, names, trade_dates)
+#
+# returns, for every input, the same sheet row classify_result would (or None
+# when the stock is filtered out). Results may be dicts or
+# company_result.CompanyResult records (rescreen.load_store holds a stored
+# run as CompanyResults to keep it compact in memory).
+
+QUARTERS = 5
+
+
+def _num(v):
+    return np.nan if v is None else float(v)
+
+
+def _right_aligned(series, width=QUARTERS):
+    """Last `width` values of a list as floats, left-padded with NaN."""
+    vals = [_num(v) for v in series[-width:]]
+    return [np.nan] * (width - len(vals)) + vals
+
+
+def _first_two(series):
+    vals = [_num(v) for v in series[:2]]
+    return vals + [np.nan] * (2 - len(vals))
+
+
+def results_to_arrays(results):
+    """Pack result dicts (or CompanyResults) into the aligned arrays classify_arrays works on."""
+    cols = {k: [] for k in ("sales", "profit_core", "opm", "borrowings", "cash_from_ops",
+                            "working_capital_days", "promoters", "marketcap", "stock_pe",
+                            "base_pe")}
+    opm_len = []
+    for r in results:
+        sales = r.get("sales") or []
+        net_profit = r.get("net_profit") or []
+        other_income = r.get("other_income") or []
+        opm = r.get("opm_percent") or []
+        profit_core = [None if n is None or o is None else n - o
+                       for n, o in zip(net_profit, other_income)]
+        industry_pe, median_pe = r.get("industry_pe"), r.get("median_pe")
+
+        cols["sales"].append(_right_aligned(sales))
+        cols["profit_core"].append(_right_aligned(profit_core))
+        cols["opm"].append(_right_aligned([opm_to_float(v) for v in opm]))
+        opm_len.append(len(opm))
+        cols["borrowings"].append(_first_two(r.get("borrowings") or []))
+        cols["cash_from_ops"].append(_first_two(r.get("cash_from_ops") or []))
+        cols["working_capital_days"].append(_first_two(r.get("working_capital_days") or []))
+        cols["promoters"].append(_first_two(r.get("promoters_last2") or []))
+        cols["marketcap"].append(_num(r.get("marketcap")))
+        cols["stock_pe"].append(_num(r.get("stock_pe")))
+        cols["base_pe"].append(_num(industry_pe if industry_pe is not None else median_pe))
+
+    arrays = {k: np.array(v, dtype=float) for k, v in cols.items()}
+    arrays["opm_len"] = np.array(opm_len, dtype=int)
+    return arrays
+
+
+def _trend(curr, prev, lower, higher, flat):
+    return np.select(
+        [np.isnan(curr) | np.isnan(prev), curr < prev, curr > prev],
+        ["N/A", lower, higher],
+        default=flat,
+    )
+
+
+def classify_arrays(a, rules=None):
+    """
+    Classification columns for the packed arrays `a`: accepted mask,
+    result_type, valuation and the six comment columns (numpy arrays of
+    length N), under the rules.py rule set `rules` (default: current).
+    """
+    rules = rules or DEFAULT_RULES
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sales, core, opm = a["sales"], a["profit_core"], a["opm"]
+        curr_sale, last4_sales = sales[:, -1], sales[:, :-1]
+        curr_core, last4_core = core[:, -1], core[:, :-1]
+        b_curr, b_prev = a["borrowings"][:, 0], a["borrowings"][:, 1]
+        p_prev, p_curr = a["promoters"][:, 0], a["promoters"][:, 1]
+        mcap, stock_pe, base_pe = a["marketcap"], a["stock_pe"], a["base_pe"]
+
+        # ---------- Filters ----------
+        promoters_zero = (~np.isnan(p_prev) & ~np.isnan(p_curr)
+                          & ((p_prev == 0) | (p_curr == 0)))
+        sales_down = (curr_sale[:, None] < last4_sales).any(axis=1)
+        core_down = (curr_core[:, None] < last4_core).any(axis=1)
+        small_cap = mcap < rules["min_marketcap"]
+        over_borrowed = b_curr > mcap
+        accepted = ~(promoters_zero | sales_down | core_down | small_cap | over_borrowed)
+
+        # ---------- Result type ----------
+        valid = ~np.isnan(last4_sales) & (last4_sales != 0)
+        sales_up = (curr_sale[:, None] - last4_sales) / last4_sales * 100.0 > rules["sales_growth_pct"]
+        sales_good = (~np.isnan(curr_sale) & valid.any(axis=1)
+                      & (sales_up | ~valid).all(axis=1))
+
+        prev_core = core[:, -2]
+        profit_good = ((prev_core != 0) & ~np.isnan(prev_core)
+                       & ((curr_core - prev_core) / prev_core * 100.0 > rules["profit_growth_pct"]))
+
+        curr_opm, prev4_opm = opm[:, -1], opm[:, :-1]
+        best_margins = ((a["opm_len"] >= 2) & ~np.isnan(curr_opm)
+                        & ((curr_opm[:, None] > prev4_opm) | np.isnan(prev4_opm)).all(axis=1))
+        borrowings_down = b_curr < b_prev
+
+        result_type = np.select(
+            [sales_good & profit_good & best_margins & borrowings_down, sales_good | profit_good],
+            ["Solid", "Best"],
+            default="Good",
+        )
+
+        # ---------- Valuation ----------
+        valuation = np.select(
+            [stock_pe < base_pe, np.abs(stock_pe - base_pe) <= rules["fair_pe_band"], stock_pe > base_pe],
+            ["Under valuation", "Fair valuation", "Over valuation"],
+            default="Unknown",
+        )
+
+    wc, cfo = a["working_capital_days"], a["cash_from_ops"]
+    return {
+        "accepted": accepted,
+        "result_type": result_type,
+        "valuation": valuation,
+        "sales_comment": np.where(sales_good,
+                                  f"Sales >{rules['sales_growth_pct']:g}% vs each of last 4",
+                                  "Sales not strongly higher"),
+        "profit_comment": np.where(profit_good,
+                                   f"Core profit >{rules['profit_growth_pct']:g}% vs last qtr",
+                                   "Core profit not strongly higher"),
+        "opm_comment": np.where(best_margins, "OPM best in 5 qtrs", "OPM not best in 5 qtrs"),
+        "borrow_comment": _trend(b_curr, b_prev, "Borrowings lower", "Borrowings higher",
+                                 "Borrowings flat"),
+        "wc_comment": _trend(wc[:, 0], wc[:, 1], "WC days lower (better)",
+                             "WC days higher (worse)", "WC days flat"),
+        "cfo_comment": _trend(cfo[:, 0], cfo[:, 1], "CFO decreased", "CFO increased", "CFO flat"),
+    }
+
+
+def _value(x):
+    return None if np.isnan(x) else float(x)
+
+
+def classify_batch(results, stock_names, trade_dates, rules=None):
+    """
+    classify_result over many results at once: a list with, per input, the
+    sheet row (see SHEET_COLUMNS) or None if the stock is filtered out.
+    `trade_dates` may be a single string for all results.
+    """
+    if isinstance(trade_dates, str):
+        trade_dates = [trade_dates] * len(results)
+    if not results:
+        return []
+    a = results_to_arrays(results)
+    c = classify_arrays(a, rules)
+    rows = []
+    for i in range(len(results)):
+        if not c["accepted"][i]:
+            rows.append(None)
+            continue
+        result_type, valuation = str(c["result_type"][i]), str(c["valuation"][i])
+        rows.append([
+            trade_dates[i],
+            stock_names[i],
+            _value(a["marketcap"][i]),
+            _value(a["stock_pe"][i]),
+            _value(a["base_pe"][i]),
+            result_type,
+            valuation,
+            str(c["sales_comment"][i]),
+            str(c["profit_comment"][i]),
+            str(c["opm_comment"][i]),
+            str(c["borrow_comment"][i]),
+            str(c["wc_comment"][i]),
+            str(c["cfo_comment"][i]),
+            f"{result_type} | {valuation}",
+        ])
+    return rows
+
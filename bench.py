@@ -0,0 +1,220 @@
+import json
+import math
+import time
+from contextlib import contextmanager
+
+import results_scraper as rs
+from replay import Fixtures, install_replay_routes
+
+# Benchmark harness: run the company-page extractors over a fixed corpus of
+# recorded pages (see replay.py), served locally through request
+# interception, and report per extractor:
+#
+#   p50 / p95 / mean latency, Playwright calls per page, bytes per page
+#
+# as JSON, so two runs can be compared with --compare.
+#
+# Bytes are attributed to the stage that is running when Playwright reports
+# the finished request, so they are approximate for back-to-back stages.
+#
+# Median PE is timed both ways: median_pe_fetch (chart data endpoint, the
+# scraper's main path) and median_pe_ui (the legacy Chart UI fallback).
+# The Chart UI stage needs the page JS in the fixtures; with
+# fixtures recorded without scripts it would only time the chart timeouts,
+# so it is skipped and listed under "skipped" in the report.
+
+EXTRACTORS = [
+    ("quarterly_financials", rs.extract_quarterly_financials),
+    ("borrowings", rs.extract_recent_borrowings),
+    ("cash_from_ops", rs.extract_recent_cash_from_ops),
+    ("working_capital_days", rs.extract_recent_working_capital_days),
+    ("promoters_last2", rs.extract_promoters_last2),
+    ("top_ratios", rs.extract_marketcap_stockpe_industrype),
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Bench:
+    """Per-stage timings, Playwright call counts and response bytes."""
+
+    def __init__(self):
+        self.current = None
+        self.times = {}     # stage -> [seconds, ...]
+        self.calls = {}     # stage -> count
+        self.bytes = {}     # stage -> bytes
+        self.pages = 0
+        self.skipped = {}   # stage -> reason
+
+    @contextmanager
+    def stage(self, name):
+        previous, self.current = self.current, name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times.setdefault(name, []).append(time.perf_counter() - start)
+            self.current = previous
+
+    def count_call(self):
+        if self.current is not None:
+            self.calls[self.current] = self.calls.get(self.current, 0) + 1
+
+    def on_request_finished(self, request):
+        if self.current is None:
+            return
+        try:
+            sizes = request.sizes()
+            n = sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except Exception:
+            return
+        self.bytes[self.current] = self.bytes.get(self.current, 0) + max(n, 0)
+
+    def report(self):
+        pages = max(self.pages, 1)
+        stages = {}
+        for name, durations in self.times.items():
+            ms = [d * 1000.0 for d in durations]
+            stages[name] = {
+                "runs": len(ms),
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p95_ms": round(percentile(ms, 95), 2),
+                "mean_ms": round(sum(ms) / len(ms), 2),
+                "calls_per_page": round(self.calls.get(name, 0) / pages, 1),
+                "bytes_per_page": round(self.bytes.get(name, 0) / pages),
+            }
+        report = {"pages": self.pages, "stages": stages}
+        if self.skipped:
+            report["skipped"] = self.skipped
+        return report
+
+
+class CountingProxy:
+    """
+    Wrap a Playwright Page/ElementHandle so every method call is counted
+    against the running stage; returned handles are wrapped too.
+    """
+
+    def __init__(self, target, bench):
+        self._target = target
+        self._bench = bench
+
+    def _wrap(self, value):
+        if isinstance(value, list):
+            return [self._wrap(v) for v in value]
+        if hasattr(value, "query_selector") and not isinstance(value, CountingProxy):
+            return CountingProxy(value, self._bench)
+        return value
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self._bench.count_call()
+            return self._wrap(attr(*args, **kwargs))
+
+        return call
+
+
+def bench_page(bench, page, url, with_median=False, chart_ui=True):
+    """
+    Time navigation, the bulk payload and each extractor on one company page.
+    chart_ui=False skips the Chart UI Median PE stage (no recorded page JS).
+    """
+    counted = CountingProxy(page, bench)
+
+    with bench.stage("navigation"):
+        counted.goto(url.split("#")[0] + "#quarters")
+        counted.wait_for_load_state("networkidle")
+
+    with bench.stage("bulk_payload"):
+        rs.parse_page_payload(rs.extract_page_payload(counted))
+
+    industry_pe = None
+    for name, extractor in EXTRACTORS:
+        with bench.stage(name):
+            out = extractor(counted)
+        if name == "top_ratios":
+            industry_pe = out[2]
+
+    if with_median or industry_pe is None:
+        with bench.stage("median_pe_fetch"):
+            rs.fetch_median_pe(counted)
+        if chart_ui:
+            with bench.stage("median_pe_ui"):
+                rs.extract_median_pe(counted)
+        else:
+            bench.skipped["median_pe_ui"] = "fixtures have no recorded scripts"
+
+    bench.pages += 1
+
+
+def company_urls(root):
+    fixtures = Fixtures(root)
+    return [
+        url for url in fixtures.urls()
+        if "/company/" in url and "/api/" not in url and fixtures.manifest[url]["status"] == 200
+    ]
+
+
+def run_benchmark(root, repeat=1, with_median=False, headless=True):
+    from playwright.sync_api import sync_playwright
+
+    bench = Bench()
+    urls = company_urls(root)
+    chart_ui = Fixtures(root).has_scripts()
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        context = browser.new_context()
+        install_replay_routes(context, root)
+        context.on("requestfinished", bench.on_request_finished)
+        page = context.new_page()
+        for _ in range(repeat):
+            for url in urls:
+                try:
+                    bench_page(bench, page, url, with_median=with_median, chart_ui=chart_ui)
+                except Exception as e:
+                    print(f"⚠ {url}: {e}")
+        browser.close()
+    return bench.report()
+
+
+def compare(old, new):
+    """Print the p50 change per stage between two benchmark reports."""
+    print(f"{'stage':<24}{'old p50':>10}{'new p50':>10}{'change':>9}")
+    for name in sorted(set(old["stages"]) | set(new["stages"])):
+        a = old["stages"].get(name, {}).get("p50_ms")
+        b = new["stages"].get(name, {}).get("p50_ms")
+        change = f"{(b - a) / a * 100:+.0f}%" if a and b is not None else "-"
+        print(f"{name:<24}{a if a is not None else '-':>10}{b if b is not None else '-':>10}{change:>9}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-extractor scrape benchmark over recorded pages.")
+    parser.add_argument("fixtures", help="fixtures directory recorded with replay.py")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--with-median", action="store_true",
+                        help="always run the Median PE extractor, not only when Industry PE is missing")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="compare against a previous report")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.fixtures, repeat=args.repeat, with_median=args.with_median)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
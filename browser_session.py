@@ -0,0 +1,147 @@
+import os
+from contextlib import contextmanager
+
+# Browser session manager: launch Chromium (with the persistent user_data
+# profile, or a fresh context seeded from a storage state) once per run, keep
+# a small pool of warm pages and hand them out to scrape jobs. A page that
+# fails a health check is replaced, and every page is recycled after
+# `recycle_after` jobs to bound renderer memory on long runs. If the context
+# itself dies it is relaunched.
+
+USER_DATA_DIR = os.path.join(os.getcwd(), "user_data")
+
+
+class BrowserSession:
+    def __init__(self, playwright, user_data_dir=USER_DATA_DIR, storage_state=None,
+                 headless=False, setup_context=None, pages=1, recycle_after=100):
+        """
+        With `storage_state` (path or dict) a regular browser + context is used
+        instead of the persistent profile, e.g. for pool workers that can't
+        share `user_data_dir`.
+        """
+        self.playwright = playwright
+        self.user_data_dir = user_data_dir
+        self.storage_state = storage_state
+        self.headless = headless
+        self.setup_context = setup_context
+        self.pool_size = pages
+        self.recycle_after = recycle_after
+        self.browser = None
+        self.context = None
+        self._idle = []
+        self._uses = {}
+        self.launches = self.recycled = 0
+
+    # ---------- Lifecycle ----------
+
+    def start(self):
+        chromium = self.playwright.chromium
+        if self.storage_state is not None:
+            self.browser = chromium.launch(headless=self.headless)
+            self.context = self.browser.new_context(storage_state=self.storage_state)
+        else:
+            self.browser = None
+            self.context = chromium.launch_persistent_context(
+                self.user_data_dir, headless=self.headless
+            )
+        if self.setup_context is not None:
+            self.setup_context(self.context)
+        self.launches += 1
+        # a persistent context opens with a blank tab already; reuse it
+        self._idle = list(self.context.pages[:self.pool_size])
+        for page in self._idle:
+            self._uses[page] = 0
+        while len(self._idle) < self.pool_size:
+            self._idle.append(self._new_page())
+        return self
+
+    def close(self):
+        for page in self._idle:
+            self._close_page(page)
+        self._idle = []
+        self._uses = {}
+        for closer in (self.context, self.browser):
+            if closer is not None:
+                try:
+                    closer.close()
+                except Exception:
+                    pass
+        self.context = self.browser = None
+
+    def restart(self):
+        print("Browser session: relaunching context")
+        self.close()
+        return self.start()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- Pages ----------
+
+    def _new_page(self):
+        page = self.context.new_page()
+        self._uses[page] = 0
+        return page
+
+    def _close_page(self, page):
+        self._uses.pop(page, None)
+        try:
+            page.close()
+        except Exception:
+            pass
+
+    def context_alive(self):
+        try:
+            self.context.cookies()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def page_alive(page):
+        if page.is_closed():
+            return False
+        try:
+            return page.evaluate("1") == 1
+        except Exception:
+            return False
+
+    def acquire(self):
+        """A healthy page from the pool (a fresh one if none is idle)."""
+        if not self.context_alive():
+            self.restart()
+        while self._idle:
+            page = self._idle.pop()
+            if self.page_alive(page):
+                return page
+            self._close_page(page)
+        return self._new_page()
+
+    def release(self, page, healthy=True):
+        """Return `page` to the pool, replacing it if unhealthy or used `recycle_after` times."""
+        if page not in self._uses:
+            return
+        self._uses[page] += 1
+        if healthy and self._uses[page] < self.recycle_after and self.page_alive(page):
+            self._idle.append(page)
+            return
+        if healthy:
+            self.recycled += 1
+        self._close_page(page)
+        if len(self._idle) < self.pool_size and self.context_alive():
+            self._idle.append(self._new_page())
+
+    @contextmanager
+    def page(self):
+        page = self.acquire()
+        healthy = True
+        try:
+            yield page
+        except Exception:
+            healthy = self.page_alive(page)
+            raise
+        finally:
+            self.release(page, healthy)
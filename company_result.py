@@ -0,0 +1,145 @@
+import math
+import struct
+import sys
+from array import array
+
+from results_scraper import opm_to_float
+
+# Compact, fixed-width form of the result dict results_page_scraper returns:
+# every series and scalar lives in one array('d') of 32 doubles (NaN for
+# missing), OPM % is kept as a number, and the object has no per-instance
+# __dict__. It serializes to 265 bytes (see to_bytes), which is also what
+# pickling sends between processes.
+#
+# It reads like the result dict (get / [] by key), so classify() and
+# batch_classifier take it as is; holding a large store of results as
+# CompanyResults (rescreen.load_store) takes about a third of the memory of
+# the dicts. Raw scraped text is not kept (OPM comes back
+# as f"{v:g}%"), so the sinks are always given the scraped dict itself.
+#
+#   packed = CompanyResult.from_dict(result)
+#   packed.sales            -> [100.0, 110.5, None, ...]
+#   packed.get("marketcap") -> 1234.5
+#   packed.to_dict()        -> the result dict shape
+
+SERIES = (
+    ("sales", 5),
+    ("other_income", 5),
+    ("opm_percent", 5),
+    ("net_profit", 5),
+    ("borrowings", 2),
+    ("cash_from_ops", 2),
+    ("working_capital_days", 2),
+    ("promoters_last2", 2),
+)
+SCALARS = ("marketcap", "stock_pe", "industry_pe", "median_pe")
+
+_OFFSETS = {}
+_pos = 0
+for _name, _width in SERIES:
+    _OFFSETS[_name] = (_pos, _width)
+    _pos += _width
+for _name in SCALARS:
+    _OFFSETS[_name] = (_pos, 1)
+    _pos += 1
+WIDTH = _pos
+
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(f"<B{len(SERIES)}B")   # version, stored length of each series
+
+
+class CompanyResult:
+    __slots__ = ("_values", "_lengths")
+
+    def __init__(self, values=None, lengths=None):
+        self._values = values if values is not None else array("d", [math.nan] * WIDTH)
+        self._lengths = lengths if lengths is not None else bytes(len(SERIES))
+
+    # ---------- dict <-> record ----------
+
+    @classmethod
+    def from_dict(cls, result):
+        values = array("d", [math.nan] * WIDTH)
+        lengths = []
+        for name, width in SERIES:
+            series = list(result.get(name) or [])[-width:]
+            if name == "opm_percent":
+                series = [opm_to_float(v) for v in series]
+            start = _OFFSETS[name][0]
+            for i, v in enumerate(series):
+                if v is not None:
+                    values[start + i] = float(v)
+            lengths.append(len(series))
+        for name in SCALARS:
+            v = result.get(name)
+            if v is not None:
+                values[_OFFSETS[name][0]] = float(v)
+        return cls(values, bytes(lengths))
+
+    def _series(self, index, name):
+        start, _ = _OFFSETS[name]
+        return [None if math.isnan(v) else v
+                for v in self._values[start:start + self._lengths[index]]]
+
+    def to_dict(self):
+        """The result dict results_page_scraper returns (OPM as "12%" text, as scraped)."""
+        result = {}
+        for index, (name, _) in enumerate(SERIES):
+            series = self._series(index, name)
+            if name == "opm_percent":
+                series = [None if v is None else f"{v:g}%" for v in series]
+            result[name] = series
+        for name in SCALARS:
+            result[name] = self._scalar(name)
+        return result
+
+    def _scalar(self, name):
+        v = self._values[_OFFSETS[name][0]]
+        return None if math.isnan(v) else v
+
+    def __getattr__(self, name):
+        if name in _OFFSETS:
+            if name in SCALARS:
+                return self._scalar(name)
+            return self._series([s for s, _ in SERIES].index(name), name)
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if key not in _OFFSETS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        """Read-only dict access, for code written against the result dict."""
+        return getattr(self, key) if key in _OFFSETS else default
+
+    def __eq__(self, other):
+        return (isinstance(other, CompanyResult) and self._lengths == other._lengths
+                and self.to_bytes() == other.to_bytes())
+
+    def __repr__(self):
+        return f"CompanyResult({self.to_dict()!r})"
+
+    # ---------- bytes ----------
+
+    def to_bytes(self):
+        values = self._values
+        if sys.byteorder == "big":
+            values = array("d", values)
+            values.byteswap()
+        return _HEADER.pack(FORMAT_VERSION, *self._lengths) + values.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, *lengths = _HEADER.unpack_from(data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported CompanyResult format {version}")
+        values = array("d")
+        values.frombytes(data[_HEADER.size:_HEADER.size + WIDTH * 8])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return cls(values, bytes(lengths))
+
+    def __reduce__(self):
+        return (CompanyResult.from_bytes, (self.to_bytes(),))
+
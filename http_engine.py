@@ -0,0 +1,217 @@
+import json
+import os
+
+import requests
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from results_scraper import (
+    HISTORY_SECTION_IDS,
+    chart_api_url,
+    company_code_from_url,
+    median_pe_from_chart,
+    parse_page_payload,
+    publish_result,
+)
+from sinks import close_sinks
+
+# Browserless engine: Screener company pages are server-rendered, so the
+# tables results_page_scraper reads are already in the initial HTML of
+# /company/<code>/. Fetch it over a pooled HTTP session and parse with lxml
+# into the same payload shape as results_scraper.extract_page_payload.
+
+BASE_URL = "https://www.screener.in"
+COOKIES_FILE = "cookies.json"   # cookies exported from the user_data profile
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+# ---------- Session / cookies ----------
+
+def load_profile_cookies(user_data_dir=None, cookies_file=COOKIES_FILE, refresh=False):
+    """
+    Return the screener.in cookies of the persistent Chromium profile.
+
+    Chromium encrypts its cookie store, so the cookies are read once through
+    a headless persistent context and cached to `cookies_file`.
+    """
+    if not refresh and os.path.exists(cookies_file):
+        with open(cookies_file) as f:
+            return json.load(f)
+
+    from playwright.sync_api import sync_playwright
+
+    user_data_dir = user_data_dir or os.path.join(os.getcwd(), "user_data")
+    with sync_playwright() as p:
+        context = p.chromium.launch_persistent_context(user_data_dir, headless=True)
+        cookies = context.cookies(BASE_URL)
+        context.close()
+
+    with open(cookies_file, "w") as f:
+        json.dump(cookies, f)
+    return cookies
+
+
+def make_session(cookies=None, pool_size=10, retries=3):
+    """requests.Session with a keep-alive connection pool and retry/backoff."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=1,
+            status_forcelist=(429, 500, 502, 503, 504),
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    for c in cookies or []:
+        session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+    return session
+
+
+def company_url(code, base_url=BASE_URL):
+    return f"{base_url}/company/{code}/"
+
+
+def fetch_company_html(session, url, timeout=20, cache=None):
+    """
+    GET a company page (fragment stripped) and return its HTML text, served
+    from / stored in the optional SnapshotCache `cache`.
+    """
+    doc_url = url.split("#")[0]
+    if cache is not None:
+        html = cache.get(doc_url)
+        if html is not None:
+            return html
+    resp = session.get(doc_url, timeout=timeout)
+    resp.raise_for_status()
+    if cache is not None:
+        cache.put(resp.url, resp.text)   # the final URL if redirected
+    return resp.text
+
+
+# ---------- HTML -> payload ----------
+
+def _text(el):
+    """Whitespace-collapsed text of an element, close to innerText for table cells."""
+    return " ".join(" ".join(el.itertext()).split())
+
+
+def _table_rows(root):
+    """Rows of the period tables under `root`, as PAGE_PAYLOAD_JS reads them."""
+    rows = []
+    tables = (root.xpath(".//table[contains(concat(' ', @class, ' '), ' data-table ')]")
+              or root.xpath(".//table"))
+    for tbl in tables:
+        for tr in tbl.xpath(".//tr"):
+            cells = [_text(c) for c in tr.xpath(".//td | .//th")]
+            if cells:
+                rows.append(cells)
+    return rows
+
+
+def payload_from_html(html_text):
+    """
+    Parse a company page into the same payload results_scraper.extract_page_payload
+    returns, so parse_page_payload works unchanged on either engine.
+    """
+    doc = lxml_html.fromstring(html_text)
+
+    sections = {}
+    for section_id in HISTORY_SECTION_IDS:
+        found = doc.xpath(f"//section[@id='{section_id}']")
+        sections[section_id] = _table_rows(found[0]) if found else None
+
+    shareholding = None
+    shp_tables = doc.xpath(
+        "//section[@id='shareholding']//*[@id='quarterly-shp']"
+        "//table[contains(concat(' ', normalize-space(@class), ' '), ' data-table ')]"
+    )
+    if shp_tables:
+        shareholding = [
+            [_text(td) for td in tr.xpath(".//td")]
+            for tr in shp_tables[0].xpath(".//tr[td]")
+        ]
+
+    # innerText of the ratios block puts each name and value on its own line
+    company_ratios = None
+    top_ratios = None
+    ratio_items = doc.xpath("//*[@id='top-ratios']//li")
+    if ratio_items:
+        top_ratios = [_text(li) for li in ratio_items]
+        lines = []
+        for li in ratio_items:
+            spans = li.xpath("./span")
+            if spans:
+                lines.extend(_text(s) for s in spans)
+            else:
+                lines.append(_text(li))
+        company_ratios = "\n".join(lines)
+
+    return {
+        "sections": sections,
+        "shareholding": shareholding,
+        "company_ratios": company_ratios,
+        "top_ratios": top_ratios,
+    }
+
+
+# ---------- MAIN SCRAPER FUNCTION (HTTP engine) ----------
+
+def fetch_median_pe(session, url, html_text, timeout=20):
+    """Median PE of the company page `url` from the chart data endpoint, or None."""
+    found = lxml_html.fromstring(html_text).xpath("//*[@data-warehouse-id]/@data-warehouse-id")
+    if not found:
+        return None
+    try:
+        resp = session.get(chart_api_url(url, found[0]), timeout=timeout,
+                           headers={"X-Requested-With": "XMLHttpRequest"})
+        resp.raise_for_status()
+        return median_pe_from_chart(resp.json())
+    except Exception as e:
+        print("Chart data fetch failed:", e)
+        return None
+
+
+def page_title(html_text):
+    """<title> of a page, the stock name every engine writes to the sheet."""
+    return (lxml_html.fromstring(html_text).findtext(".//title") or "").strip() or None
+
+
+def result_from_html(session, url, html_text, history=False):
+    """Result dict of the company page `url` from its HTML (Median PE fetched if needed)."""
+    result = parse_page_payload(payload_from_html(html_text), history)
+    if result["industry_pe"] is None:
+        result["median_pe"] = fetch_median_pe(session, url, html_text)
+        print("Median PE (fallback):", result["median_pe"])
+    return result
+
+
+def http_page_scraper(session, url, stock_name=None, trade_date_str=None, cache=None,
+                      history=False):
+    """
+    Browserless counterpart of results_scraper.results_page_scraper: fetch
+    `url` with `session`, parse it and return the same result dict
+    (optionally classified and written to Google Sheets, named after the
+    page title unless `stock_name` is given). history=True also keeps the
+    full tables under result["history"].
+    """
+    html_text = fetch_company_html(session, url, cache=cache)
+    result = result_from_html(session, url, html_text, history)
+    if stock_name is None and trade_date_str is not None:
+        stock_name = page_title(html_text)
+    return publish_result(result, stock_name, trade_date_str, company_code_from_url(url))
+
+
+# ---------- Standalone debug harness ----------
+
+if __name__ == "__main__":
+    session = make_session(load_profile_cookies())
+    http_page_scraper(session, company_url("531802"))
+    close_sinks()
@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+from results_scraper import company_code_from_url
+from sinks import flush_sinks, trade_day_key
+
+# Persistent run ledger: one row per (trade_date, company_code) with its
+# completion state, so a rerun after a crash skips the companies that were
+# already scraped and written instead of starting again from page 1.
+#
+# Callers pass the site's day label ('14 November', as every run mode gets
+# it); the ledger stores it as the ISO day (sinks.trade_day), so next year's
+# 14 November isn't taken as already done.
+#
+#   status: "done" (scraped and flushed by every sink) or "failed" (retried
+#   on the next run)
+#
+# Sinks buffer rows (Sheets, SQLite and Parquet all batch), so a company is
+# only marked done at a checkpoint: mark_written() queues it, and
+# checkpoint() flushes the sinks and, if they all succeeded, commits the
+# queued companies. A crash loses the queue, and those companies are scraped
+# again on the rerun instead of being skipped unsaved.
+
+DEFAULT_PATH = "run_ledger.sqlite"
+
+
+class RunLedger:
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS ledger (
+        trade_date   TEXT NOT NULL,
+        company_code TEXT NOT NULL,
+        status       TEXT NOT NULL,
+        attempts     INTEGER NOT NULL DEFAULT 0,
+        error        TEXT,
+        updated_at   TEXT NOT NULL,
+        PRIMARY KEY (trade_date, company_code)
+    )
+    """
+
+    def __init__(self, path=DEFAULT_PATH, checkpoint_every=50):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self._written = []
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(self.SCHEMA)
+        self._rekey()
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def _rekey(self):
+        """Move rows keyed by a day label to its ISO day in the year they were updated."""
+        rows = self._conn.execute(
+            "SELECT trade_date, company_code, updated_at FROM ledger"
+            " WHERE trade_date NOT LIKE '____-__-__'"
+        ).fetchall()
+        for trade_date, code, updated_at in rows:
+            day = trade_day_key(trade_date, datetime.fromisoformat(updated_at).date())
+            if day != trade_date:
+                self._conn.execute(
+                    "UPDATE OR REPLACE ledger SET trade_date = ? "
+                    "WHERE trade_date = ? AND company_code = ?",
+                    (day, trade_date, code),
+                )
+
+    def _set(self, trade_date, company_code, status, error=None):
+        trade_date = trade_day_key(trade_date)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO ledger VALUES (?, ?, ?, 1, ?, ?)
+                ON CONFLICT (trade_date, company_code) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = attempts + 1,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                (trade_date, company_code, status, error, now),
+            )
+            self._conn.commit()
+
+    def mark_done(self, trade_date, company_code):
+        self._set(trade_date, company_code, "done")
+
+    def mark_failed(self, trade_date, company_code, error):
+        self._set(trade_date, company_code, "failed", repr(error))
+
+    def mark_written(self, trade_date, company_code):
+        """Queue a company handed to the sinks; it becomes done at the next checkpoint."""
+        with self._lock:
+            self._written.append((trade_date, company_code))
+            due = len(self._written) >= self.checkpoint_every
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Flush the output sinks and mark the companies written since the last
+        checkpoint done. Nothing is marked if a sink fails to flush; returns
+        the number of companies marked.
+        """
+        if not flush_sinks():
+            print("⚠ Ledger: sinks didn't flush, written companies stay pending.")
+            return 0
+        with self._lock:
+            written, self._written = self._written, []
+        for trade_date, company_code in written:
+            self.mark_done(trade_date, company_code)
+        return len(written)
+
+    def done_codes(self, trade_date):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT company_code FROM ledger WHERE trade_date = ? AND status = 'done'",
+                (trade_day_key(trade_date),),
+            ).fetchall()
+        return {code for (code,) in rows}
+
+    def pending(self, jobs):
+        """`jobs` without the ones already done for their trade date."""
+        done = {}
+        todo = []
+        for job in jobs:
+            day = trade_day_key(job["trade_date"])
+            if day not in done:
+                done[day] = self.done_codes(day)
+            code = job.get("code") or company_code_from_url(job["url"])
+            if code not in done[day]:
+                todo.append(job)
+        skipped = len(jobs) - len(todo)
+        if skipped:
+            print(f"Ledger: skipping {skipped} companies already done, {len(todo)} to scrape.")
+        return todo
+
+    def stats(self, trade_date):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM ledger WHERE trade_date = ? GROUP BY status",
+                (trade_day_key(trade_date),),
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,211 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from lxml import html as lxml_html
+
+from http_engine import make_session
+from replay import is_intercepted
+from results_scraper import clean_stock_name, company_code_from_url
+from readiness import first_listing_href, wait_for_listing_swap
+
+# Results listing harvester: read every company link (href, name, code) of a
+# results listing page with one page.evaluate call, across all pagination
+# pages, and turn them into a work queue of jobs
+#
+#   {"url": ..., "name": ..., "code": ..., "trade_date": ...}
+#
+# instead of clicking each row into a new tab and scrolling the listing.
+#
+# harvest_listing_parallel reads the pagination once for the last page number
+# and the query parameter that selects a page, then fetches pages 2..N
+# concurrently over HTTP (the listing is server-rendered) with the browser's
+# cookies. Under --record/--replay those pages are read in extra tabs of the
+# browser context instead, so they go through the fixture routes.
+
+# Every row link of the results listing (the old serial loop clicked the odd
+# div[2*i+1] rows one by one).
+LISTING_LINK_XPATH = "/html/body/div/div[2]/main/div[2]/div/div[1]/a[1]"
+PAGINATION_XPATH = "/html/body/div/div[2]/main/p/a"
+
+# {url, text} of every anchor matching an XPath (listing rows, pagination)
+ANCHORS_JS = """
+(xpath) => {
+    const found = document.evaluate(xpath, document, null,
+        XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const links = [];
+    for (let i = 0; i < found.snapshotLength; i++) {
+        const a = found.snapshotItem(i);
+        links.push({url: a.href, text: a.innerText.trim()});
+    }
+    return links;
+}
+"""
+
+
+def _jobs_from_links(links, trade_date_str, seen):
+    jobs = []
+    for link in links:
+        code = company_code_from_url(link["url"])
+        if code is None or code in seen:
+            continue
+        seen.add(code)
+        jobs.append({
+            "url": link["url"],
+            "name": clean_stock_name(link["text"]) or code,
+            "code": code,
+            "trade_date": trade_date_str,
+        })
+    return jobs
+
+
+def harvest_page(page, trade_date_str, seen=None):
+    """One job per company linked from the listing page currently open in `page`."""
+    seen = set() if seen is None else seen
+    links = page.evaluate(ANCHORS_JS, LISTING_LINK_XPATH)
+    return _jobs_from_links(links, trade_date_str, seen)
+
+
+def links_from_html(html_text, base_url):
+    """Company links of a listing page's HTML, same shape as ANCHORS_JS returns."""
+    tree = lxml_html.fromstring(html_text).getroottree()
+    return [
+        {"url": urljoin(base_url, a.get("href", "")), "text": " ".join(a.text_content().split())}
+        for a in tree.xpath(LISTING_LINK_XPATH)
+    ]
+
+
+def harvest_listing(page, trade_date_str, max_pages=40):
+    """
+    Walk the open results listing page by page (clicking the pagination
+    links) and return the jobs of every company on it, deduplicated by code.
+    """
+    jobs = []
+    seen = set()
+    for current_page in range(1, max_pages):
+        jobs.extend(harvest_page(page, trade_date_str, seen))
+        print(f"Listing page {current_page}: {len(jobs)} companies so far")
+
+        try:
+            previous_href = first_listing_href(page)
+            page.click(f"xpath={PAGINATION_XPATH}[{current_page}]", timeout=5000)
+        except Exception:
+            break
+        wait_for_listing_swap(page, previous_href)
+    return jobs
+
+
+# ---------- Direct page URLs ----------
+
+def pagination_plan(page):
+    """
+    (last_page, page_url) from the pagination links of the open listing,
+    where page_url(n) is the URL of listing page n. page_url is None when
+    the listing has a single page or the page parameter can't be identified.
+    """
+    links = page.evaluate(ANCHORS_JS, PAGINATION_XPATH)
+    last_page, keys, template = 1, None, None
+    for link in links:
+        if not re.fullmatch(r"\d+", link["text"]):
+            continue            # "Next", "…"
+        last_page = max(last_page, int(link["text"]))
+        matching = {key for key, value in parse_qsl(urlsplit(link["url"]).query)
+                    if value == link["text"]}
+        if not matching:
+            continue            # page 1 is often the bare listing URL
+        # The page parameter matches its link's number on every link; another
+        # parameter (e.g. result_update_date__day=14) can match on one of them
+        keys = matching if keys is None else keys & matching
+        template = link["url"]
+    if last_page == 1 or not keys or len(keys) > 1:
+        return last_page, None
+    param = keys.pop()
+
+    def page_url(n):
+        parts = urlsplit(template)
+        query = [(k, v) for k, v in parse_qsl(parts.query) if k != param] + [(param, str(n))]
+        return urlunsplit(parts._replace(query=urlencode(query), fragment=""))
+
+    return last_page, page_url
+
+
+def _links_over_http(session, urls, workers):
+    def fetch(url):
+        try:
+            resp = session.get(url, timeout=20)
+            resp.raise_for_status()
+            return links_from_html(resp.text, url)
+        except Exception as e:
+            print(f"⚠ listing page {url} failed over HTTP: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fetch, urls))
+
+
+def _links_in_browser(context, urls, workers):
+    """Listing links of `urls`, read in up to `workers` tabs of `context` at a time."""
+    pages = []
+    for i in range(0, len(urls), workers):
+        batch = urls[i:i + workers]
+        tabs = [context.new_page() for _ in batch]
+        try:
+            started = []
+            for tab, url in zip(tabs, batch):
+                try:
+                    tab.goto(url, wait_until="commit")
+                    started.append(True)
+                except Exception as e:
+                    print(f"⚠ listing page {url} failed in the browser: {e}")
+                    started.append(False)
+            for tab, url, ok in zip(tabs, batch, started):
+                links = None
+                if ok:
+                    try:
+                        tab.wait_for_load_state("domcontentloaded")
+                        links = tab.evaluate(ANCHORS_JS, LISTING_LINK_XPATH)
+                    except Exception as e:
+                        print(f"⚠ listing page {url} failed in the browser: {e}")
+                pages.append(links)
+        finally:
+            for tab in tabs:
+                tab.close()
+    return pages
+
+
+def harvest_listing_parallel(page, trade_date_str, workers=8, session=None):
+    """
+    Jobs for every company of the open results listing: page 1 is read from
+    the browser, pages 2..last are fetched concurrently by URL (over HTTP,
+    or in browser tabs when the context is recorded/replayed). Pages that
+    fail over HTTP are retried in a browser tab; pages that fail there are
+    skipped. Falls back to harvest_listing when the pagination can't be
+    turned into URLs.
+    """
+    last_page, page_url = pagination_plan(page)
+    if page_url is None and page.query_selector(f"xpath={PAGINATION_XPATH}") is not None:
+        return harvest_listing(page, trade_date_str)
+    seen = set()
+    jobs = harvest_page(page, trade_date_str, seen)
+    if page_url is None:
+        return jobs
+
+    urls = [page_url(n) for n in range(2, last_page + 1)]
+    if is_intercepted(page.context):
+        pages = _links_in_browser(page.context, urls, workers)
+    else:
+        session = session or make_session(cookies=page.context.cookies(), pool_size=workers)
+        pages = _links_over_http(session, urls, workers)
+        failed = [url for url, links in zip(urls, pages) if links is None]
+        if failed:
+            retried = dict(zip(failed, _links_in_browser(page.context, failed, workers)))
+            pages = [retried.get(url) if links is None else links
+                     for url, links in zip(urls, pages)]
+
+    for url, links in zip(urls, pages):
+        if links is None:
+            print(f"⚠ listing page {url} skipped")
+            continue
+        jobs.extend(_jobs_from_links(links, trade_date_str, seen))
+    print(f"Listing: {last_page} pages, {len(jobs)} companies")
+    return jobs
@@ -1,7 +1,20 @@
-from playwright.sync_api import sync_playwright
-import time
-import os
 from results_scraper import results_page_scraper
+from replay import Recorder, install_replay_routes
+from snapshot_cache import SnapshotCache
+from sinks import ParquetSink, SQLiteSink, add_sink, close_sinks, set_sinks, trade_day, trade_day_key
+from metrics import METRICS, span
+from listing import harvest_listing_parallel
+from ledger import DEFAULT_PATH as LEDGER_PATH, RunLedger
+from browser_session import BrowserSession
+from backfill import previous_result_day
+from resource_policy import install_block_policy
+from readiness import (
+    WAIT_STATS,
+    click_and_wait_for_navigation,
+    wait_for_listing_rows,
+    wait_for_load,
+    wait_for_results_nav,
+)
 ## placeholder func ; 
 # def right_page (page) --> ## returns the page on which I am supposed to be scrolling 
 
@@ -9,7 +22,6 @@ from results_scraper import results_page_scraper
 
 # def excel (values [] -> list ) --> ## returns a list to be uploaded on excel spreadsheet 
 from datetime import datetime
-from results_scraper import results_page_scraper
 year = datetime.now().year
 print("the year is  :" , year)
 def parse_date(date_str: str) -> list:
@@ -25,179 +37,337 @@ def parse_date(date_str: str) -> list:
     month = months[month_str]
 
     return [day, month]
-def run(playwright):
-    
-    # Define where to store browser state (cookies, sessions, localStorage)
-    for itn in range(0,2):
-        user_data_dir = os.path.join(os.getcwd(), "user_data")
-
-        # Launch persistent context instead of a new browser each time
-        browser = playwright.chromium.launch_persistent_context(
-            user_data_dir,
-            headless=False # Set True to run in background
-        )
-
-        # Reuse the same context tab
-        page = browser.new_page()
-
-        #page.goto("https://www.google.com/")
-        page.goto("https://www.screener.in/results/latest/")
-        time.sleep(15)
-        
-
-        ### october xpath : /html/body/div/div[2]/main/div[1]/nav/a[2]
-        ### november xpath : /html/body/div/div[2]/main/div[1]/nav/a[3]
-        ### invalid xpath : /html/body/div/div[2]/main/div[1]/nav/a[4] --> just go from 1->not found , last one found is the one to click , just check for existance first 
-        final_month_xpath = ""
-        for i in range(1,13):
-            month_xpath = f"/html/body/div/div[2]/main/div[1]/nav/a[{i}]"
-            element = page.query_selector(f"xpath={month_xpath}")
-            if(element):
-                final_month_xpath = month_xpath
-                print("fine ")
-            else:
-                break
-        # now I am outside loop which brings me to the most recent month which is a valid option 
-        page.dblclick(f"xpath={final_month_xpath}")
-        
-        time.sleep(3)
-        ### now i've navigated to the most recent month ,I'll navigate now to the most recent date 
-
-        final_day_xpath = ""
-        final_prev_day_xpath = ""
-        for i in range(1,32):
-            day_xpath = f"/html/body/div/div[2]/main/div[1]/nav/a[{i}]"
-                          
-            prev_day_xpath = f"/html/body/div/div[2]/main/div[1]/nav/a[{i-1}]"
-            element = page.query_selector(f"xpath={day_xpath}")
-            if(element):
-                final_day_xpath = day_xpath
-                final_prev_day_xpath = prev_day_xpath
-            else:
-                break
-        
-        ## now I have have final day and prev final day , both of which need to be scraped 
-        ## I have arrived on desired page ,will start scraping function differently assuming it's on this page 
-        #page.dbclick(f"xpath={final_day_xpath}")
-        today = page.text_content(f"xpath={final_day_xpath}")
-        print(today)
-
-        #page.dbclick(f"xpath={final_prev_day_xpath}")
-        prev_day = page.text_content(f"xpath={final_prev_day_xpath}")
-        print(prev_day)
-        
-
-        if(itn==0):
-
-            print("\n\n====================")
-            print("ENTERED itn == 0 BLOCK")
-            print("====================\n")
-
-            print(f"Double clicking FINAL DAY XPATH: {final_day_xpath}")
-            page.dblclick(f"xpath={final_day_xpath}")
-            print("Successfully navigated into today's updates page.")
-            time.sleep(3)
-
-            
-
-            for current_page in range(1,40):
-
-
-                print("\n====================")
-                print("STARTING STOCK LOOP")
-                print("====================\n")
-
-                for i in range(0, 30):
-
-                    print(f"\n--- Loop iteration i = {i} ---")
-                    link_xpath = f"/html/body/div/div[2]/main/div[2]/div[{2*i+1}]/div[1]/a[1]/span" 
-                    print(f"Trying to click row with XPATH: {link_xpath}")
-
-                    try:
-                        # Check if element exists
-                        element = page.query_selector(f"xpath={link_xpath}")
-                        if not element:
-                            print(f"❌ Element not found: {link_xpath}")
-                            continue
-
-                        print("✔ Element FOUND. Now waiting for new page to open...")
-
-                        with browser.expect_page() as new_page_info:
-                            page.click(f"xpath={link_xpath}")
-
-                        print("✔ New tab OPENED")
 
-                        new_page = new_page_info.value
-                        print("Waiting for new page load state...")
-                        new_page.wait_for_load_state()
-                        #time.sleep(3)
-
-                        # title
-                        page_title = new_page.title()
-###### scrape results page
-                        #results_page_scraper(new_page)
-                        results_page_scraper(
-                            new_page,
-                            stock_name=page_title,       # or better extract company name
-                            trade_date_str=today         # the extracted date string
-                        )
-
-                        print(f"--- NEW COMPANY PAGE TITLE: {page_title}")
-                        #time.sleep(3)
-
-                        # -------------- Close the tab --------------
-                        print("Closing new page/tab...")
-                        new_page.close()
-                        print("✔ New page closed.")
-
-                        # -------------- Restore old page --------------
-                        print("Bringing original page to front...")
-                        page.bring_to_front()
-                        print("✔ Original page focused.")
-
-                        # Requested: ADD sleep after close
-                        print("Sleeping for 3 seconds after closing tab...")
-                        #time.sleep(3)
-
-                        # Requested: scroll down 300px
-                        print("Scrolling down 300px on original page...")
-                        page.evaluate("window.scrollBy(0, 300)")
-
-                        #time.sleep(4)
+def navigate_to_latest_day(page):
+    """
+    From /results/latest/, open the most recent month and return
+    (today, final_day_xpath) of its latest results day.
+    """
+    ### october xpath : /html/body/div/div[2]/main/div[1]/nav/a[2]
+    ### november xpath : /html/body/div/div[2]/main/div[1]/nav/a[3]
+    ### invalid xpath : /html/body/div/div[2]/main/div[1]/nav/a[4] --> just go from 1->not found , last one found is the one to click , just check for existance first 
+    final_month_xpath = ""
+    for i in range(1,13):
+        month_xpath = f"/html/body/div/div[2]/main/div[1]/nav/a[{i}]"
+        element = page.query_selector(f"xpath={month_xpath}")
+        if(element):
+            final_month_xpath = month_xpath
+            print("fine ")
+        else:
+            break
+    # now I am outside loop which brings me to the most recent month which is a valid option 
+    if not click_and_wait_for_navigation(page, f"xpath={final_month_xpath}", "month navigation"):
+        print("⚠ month link didn't navigate")
+    wait_for_load(page, "month page")
+    ### now i've navigated to the most recent month ,I'll navigate now to the most recent date 
+
+    final_day_xpath = ""
+    for i in range(1,32):
+        day_xpath = f"/html/body/div/div[2]/main/div[1]/nav/a[{i}]"
+        element = page.query_selector(f"xpath={day_xpath}")
+        if(element):
+            final_day_xpath = day_xpath
+        else:
+            break
 
-                    except Exception as e:
-                        print("\n⚠⚠⚠ ERROR inside row loop:")
-                        print("Error:", e)
-                        print("Continuing loop...\n")
-                time.sleep(3)
+    ## I have arrived on desired page ,will start scraping function differently assuming it's on this page 
+    #page.dbclick(f"xpath={final_day_xpath}")
+    # Link text comes with the page's whitespace; trim it like backfill does
+    # so the sheet, sinks and ledger all get the same day label
+    today = page.text_content(f"xpath={final_day_xpath}").strip()
+    print(today, trade_day_key(today))
 
+    return today, final_day_xpath
 
 
-                print("\n====================")
-                print("ATTEMPTING NEXT PAGE CLICK")
-                print("====================\n")
+def run(playwright, setup_context=None, ledger=None, history=False, cache=None):
+    
+    scraped = set()
+    # Launch the persistent user_data profile once for both days, with a warm
+    # listing page and company page
+    session = BrowserSession(
+        playwright,
+        headless=False, # Set True to run in background
+        setup_context=setup_context,
+        pages=2,
+    ).start()
+    today = None
+    for itn in range(0,2):
+        page = session.acquire()
 
-                try:
-                    next_page_xpath = f"/html/body/div/div[2]/main/p/a[{current_page}]"
-                    print(f"Clicking NEXT PAGE button XPATH = {next_page_xpath}")
-                    page.click(f"xpath={next_page_xpath}")
-                    print("✔ Successfully clicked NEXT PAGE button")
-                    time.sleep(3)
-                except Exception as e:
-                    print("The day has been scraped. No NEXT PAGE found.")
-                    print("Error:", e)
-                    print("Exiting day loop...\n")
-                
+        # itn 0 scrapes the latest results day, itn 1 the one before it
+        if itn == 0:
+            #page.goto("https://www.google.com/")
+            with span("listing_navigation"):
+                page.goto("https://www.screener.in/results/latest/")
+                wait_for_results_nav(page)
+                today, day_xpath = navigate_to_latest_day(page)
+            day = today
 
+            print("\n\n====================")
+            print(f"ITERATION {itn}: {day}")
+            print("====================\n")
 
+            print(f"Double clicking DAY XPATH: {day_xpath}")
+            if not click_and_wait_for_navigation(page, f"xpath={day_xpath}", "day navigation"):
+                print(f"⚠ day link for {day} didn't navigate; skipping the day")
+                session.release(page)
+                continue
         else:
-            #page.dblclick(prev_day_xpath)
-            break
-
+            # The day before may be in the previous month (when the latest
+            # day is the first link of its month), so look it up across months
+            latest = trade_day(today)
+            with span("listing_navigation"):
+                prev = previous_result_day(page, latest) if latest else None
+            if prev is None:
+                print(f"⚠ no results day found before {today}")
+                session.release(page)
+                break
+            _, day, day_url = prev
 
-        browser.close()
+            print("\n\n====================")
+            print(f"ITERATION {itn}: {day}")
+            print("====================\n")
 
-with sync_playwright() as playwright:
-    run(playwright)
+            page.goto(day_url)
+        print("Successfully navigated into the day's updates page.")
+        wait_for_listing_rows(page)
+
+        # Read every company link of every listing page first, then open
+        # them one by one in a single reused tab.
+        try:
+            with span("listing_harvest"):
+                jobs = harvest_listing_parallel(page, day)
+        except Exception as e:
+            METRICS.error("listing_harvest", e, trade_date=day)
+            print(f"⚠ listing harvest failed for {day}: {e}")
+            session.release(page, healthy=False)
+            continue
+        print(f"Harvested {len(jobs)} companies for {day}")
+        # A company listed on both days was already scraped for the later one
+        jobs = [job for job in jobs if job["code"] not in scraped]
+        if ledger is not None:
+            jobs = ledger.pending(jobs)
+
+        for job in jobs:
+            print(f"\n--- {job['name']} ({job['code']}) ---")
+            try:
+                with session.page() as company_page:
+                    # No stock_name: rows keep the page-title name (and so the
+                    # (Date, Stock Name) dedup key) of earlier runs, not the
+                    # listing's anchor text
+                    results_page_scraper(
+                        company_page,
+                        trade_date_str=day,
+                        url=job["url"],
+                        cache=cache,
+                        history=history,
+                    )
+                scraped.add(job["code"])
+                METRICS.stock_done(ok=True, code=job["code"], trade_date=day)
+                if ledger is not None:
+                    ledger.mark_written(day, job["code"])
+            except Exception as e:
+                if ledger is not None:
+                    ledger.mark_failed(day, job["code"], e)
+                METRICS.error("company", e, code=job["code"])
+                METRICS.stock_done(ok=False, code=job["code"], trade_date=day)
+                print("\n⚠⚠⚠ ERROR scraping", job["url"])
+                print("Error:", e)
+                print("Continuing loop...\n")
+
+        session.release(page)
+
+    if ledger is not None:
+        with span("sink_flush"):
+            ledger.checkpoint()
+    session.close()
+
+
+# ---------- Worker-pool mode ----------
+
+def collect_latest_jobs(playwright, setup_context=None):
+    """
+    Harvest every company of the latest results day with the persistent
+    profile, then close it. Returns (today, jobs, storage_state).
+    """
+    session = BrowserSession(playwright, headless=False, setup_context=setup_context).start()
+    page = session.acquire()
+    page.goto("https://www.screener.in/results/latest/")
+    wait_for_results_nav(page)
+
+    today, final_day_xpath = navigate_to_latest_day(page)
+    if not click_and_wait_for_navigation(page, f"xpath={final_day_xpath}", "day navigation"):
+        raise RuntimeError(f"day link for {today} didn't navigate")
+    wait_for_listing_rows(page)
+
+    with span("listing_collect"):
+        jobs = harvest_listing_parallel(page, today)
+    storage_state = session.context.storage_state()
+    session.close()
+    return today, jobs, storage_state
+
+
+def run_pool(playwright, workers=4, min_interval=1.0, cache=None, setup_context=None,
+             ledger=None, history=False):
+    """Collect all of the latest day's company URLs first, then scrape them through a worker pool."""
+    from worker_pool import scrape_with_pool
+
+    # Workers can't share the persistent profile; hand them its cookies instead
+    today, jobs, storage_state = collect_latest_jobs(playwright, setup_context)
+    print(f"Collected {len(jobs)} companies for {today}; scraping with {workers} workers.")
+    return scrape_with_pool(
+        jobs,
+        workers=workers,
+        min_interval=min_interval,
+        storage_state=storage_state,
+        cache=cache,
+        setup_context=setup_context,
+        ledger=ledger,
+        history=history,
+    )
+
+
+def run_sharded(playwright, shards=None, engine="browser", min_interval=1.0, cache_dir=None,
+                block=True, setup_context=None, ledger=None, history=False, cache_ttl=None,
+                refresh_profiles=False):
+    """
+    Collect the latest day's company URLs, then scrape them across a process
+    pool. setup_context only applies to the listing harvest here; shard
+    processes build their own contexts (so no record/replay routes).
+    """
+    from shard_pool import scrape_sharded
+
+    today, jobs, _ = collect_latest_jobs(playwright, setup_context)
+    print(f"Collected {len(jobs)} companies for {today}; sharding across processes.")
+    return scrape_sharded(
+        jobs,
+        shards=shards,
+        engine=engine,
+        min_interval=min_interval,
+        cache_dir=cache_dir,
+        block=block,
+        ledger=ledger,
+        history=history,
+        cache_ttl=cache_ttl,
+        refresh_profiles=refresh_profiles,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from playwright.sync_api import sync_playwright
+
+    parser = argparse.ArgumentParser(description="Scrape the latest Screener results day.")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="concurrent browser pages (0 = original serial click-through)")
+    parser.add_argument("--min-interval", type=float, default=1.0,
+                        help="minimum seconds between requests to the same host")
+    parser.add_argument("--sqlite", metavar="PATH",
+                        help="also store raw results + classification in this SQLite file")
+    parser.add_argument("--parquet", metavar="DIR",
+                        help="also store raw results + classification as Parquet files in DIR")
+    parser.add_argument("--no-sheet", action="store_true",
+                        help="don't write to Google Sheets")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="serve/store company pages from this snapshot cache")
+    parser.add_argument("--cache-ttl", type=float, default=6.0,
+                        help="snapshot cache TTL in hours")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="append per-stage timings and run events to PATH as JSON lines")
+    parser.add_argument("--ledger", metavar="PATH", default=LEDGER_PATH,
+                        help="run ledger recording finished companies per trade date; "
+                             "reruns skip them")
+    parser.add_argument("--no-ledger", action="store_true",
+                        help="scrape every company, ignoring and not updating the ledger")
+    parser.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD",
+                        help="backfill: scrape every results day from this date "
+                             "(through the worker pool)")
+    parser.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD",
+                        help="backfill: last day to scrape (default today)")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="scrape across this many processes, each with its own copy of "
+                             "the profile (-1 = one per CPU)")
+    parser.add_argument("--refresh-profiles", action="store_true",
+                        help="re-copy user_data into every shard's profile before scraping")
+    parser.add_argument("--engine", choices=("browser", "http"), default="browser",
+                        help="scrape engine of each shard process")
+    parser.add_argument("--no-block", action="store_true",
+                        help="load images, fonts, trackers and chart assets on company pages")
+    parser.add_argument("--history", action="store_true",
+                        help="also store every period of the quarters, P&L, balance sheet, "
+                             "cash flow and ratios tables in the local sinks")
+    replay_group = parser.add_mutually_exclusive_group()
+    replay_group.add_argument("--record", metavar="DIR",
+                              help="save listing and company pages to a fixtures directory")
+    replay_group.add_argument("--replay", metavar="DIR",
+                              help="serve all pages from a fixtures directory (no network)")
+    args = parser.parse_args()
+    if args.shards and (args.record or args.replay):
+        parser.error("--shards can't be combined with --record/--replay "
+                     "(shard processes don't use the fixture routes)")
+
+    if args.metrics:
+        METRICS.configure(args.metrics)
+
+    # Hooks run on every browser context, in order (later routes are consulted first)
+    context_hooks = []
+    recorder = None
+    if args.record:
+        recorder = Recorder(args.record)
+        context_hooks.append(recorder.attach)
+    elif args.replay:
+        context_hooks.append(lambda context: install_replay_routes(context, args.replay))
+    if not args.no_block:
+        context_hooks.append(install_block_policy)
+
+    def setup_context(context):
+        for hook in context_hooks:
+            hook(context)
+
+    cache = None
+    if args.cache_dir:
+        cache = SnapshotCache(args.cache_dir, ttl=args.cache_ttl * 3600)
+
+    if args.no_sheet:
+        set_sinks([])
+    if args.sqlite:
+        add_sink(SQLiteSink(args.sqlite))
+    if args.parquet:
+        add_sink(ParquetSink(args.parquet))
+
+    ledger = None if args.no_ledger else RunLedger(args.ledger)
+
+    with sync_playwright() as playwright:
+        if args.date_from:
+            from backfill import run_backfill
+
+            start = datetime.strptime(args.date_from, "%Y-%m-%d").date()
+            end = datetime.strptime(args.date_to, "%Y-%m-%d").date() if args.date_to else datetime.now().date()
+            run_backfill(playwright, start, end, workers=max(args.workers, 1),
+                         min_interval=args.min_interval, cache=cache,
+                         setup_context=setup_context, ledger=ledger,
+                         history=args.history)
+        elif args.shards:
+            run_sharded(playwright, shards=None if args.shards < 0 else args.shards,
+                        engine=args.engine, min_interval=args.min_interval,
+                        cache_dir=args.cache_dir, block=not args.no_block,
+                        setup_context=setup_context, ledger=ledger,
+                        history=args.history, cache_ttl=args.cache_ttl * 3600,
+                        refresh_profiles=args.refresh_profiles)
+        elif args.workers > 0:
+            run_pool(playwright, workers=args.workers, min_interval=args.min_interval,
+                     cache=cache, setup_context=setup_context, ledger=ledger,
+                     history=args.history)
+        else:
+            run(playwright, setup_context=setup_context, ledger=ledger,
+                history=args.history, cache=cache)
+    with span("sink_close"):
+        close_sinks()
+    if recorder is not None:
+        recorder.close()
+    WAIT_STATS.report()
+    METRICS.report()
 
 
@@ -0,0 +1,116 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Run instrumentation: timed spans around each stage of a run (navigation,
+# listing pagination, tab open, extractors, classification, sink writes),
+# emitted as JSON lines, plus an end-of-run summary with throughput, error
+# counts and time per stage.
+#
+#   {"ts": 1731571391.2, "event": "span", "stage": "navigation",
+#    "duration_ms": 812.4, "ok": true, "url": "..."}
+
+
+class RunMetrics:
+    def __init__(self, path=None):
+        self.path = path
+        self._out = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.stages = {}     # stage -> [count, total_s, max_s]
+        self.errors = {}     # stage -> count
+        self.stocks = 0
+        self.failed_stocks = 0
+
+    def configure(self, path):
+        """Write JSON lines to `path` (appending); None disables the file output."""
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+            self.path = path
+            self._out = open(path, "a") if path else None
+
+    def emit(self, event, **fields):
+        line = {"ts": round(time.time(), 3), "event": event, **fields}
+        with self._lock:
+            if self._out is not None:
+                self._out.write(json.dumps(line, default=str) + "\n")
+                self._out.flush()
+
+    @contextmanager
+    def span(self, stage, **fields):
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except Exception as e:
+            ok = False
+            fields["error"] = repr(e)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                entry = self.stages.setdefault(stage, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += duration
+                entry[2] = max(entry[2], duration)
+                if not ok:
+                    self.errors[stage] = self.errors.get(stage, 0) + 1
+            self.emit("span", stage=stage, duration_ms=round(duration * 1000, 1), ok=ok, **fields)
+
+    def error(self, stage, err, **fields):
+        """Record an error that was handled without raising out of a span."""
+        with self._lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+        self.emit("error", stage=stage, error=repr(err), **fields)
+
+    def stock_done(self, ok=True, **fields):
+        with self._lock:
+            self.stocks += 1
+            if not ok:
+                self.failed_stocks += 1
+        self.emit("stock", ok=ok, **fields)
+
+    def summary(self):
+        with self._lock:
+            elapsed = time.time() - self.started
+            return {
+                "elapsed_s": round(elapsed, 1),
+                "stocks": self.stocks,
+                "failed_stocks": self.failed_stocks,
+                "stocks_per_min": round(self.stocks / elapsed * 60, 2) if elapsed > 0 else None,
+                "errors": dict(self.errors),
+                "stages": {
+                    stage: {
+                        "count": count,
+                        "total_s": round(total, 2),
+                        "mean_ms": round(total / count * 1000, 1),
+                        "max_ms": round(longest * 1000, 1),
+                    }
+                    for stage, (count, total, longest) in self.stages.items()
+                },
+            }
+
+    def report(self, stream=sys.stdout):
+        summary = self.summary()
+        self.emit("summary", **summary)
+        print("\n==== RUN SUMMARY ====", file=stream)
+        print(f"{summary['stocks']} stocks ({summary['failed_stocks']} failed) in "
+              f"{summary['elapsed_s']}s — {summary['stocks_per_min']} stocks/min", file=stream)
+        for stage, s in sorted(summary["stages"].items(), key=lambda kv: -kv[1]["total_s"]):
+            errors = summary["errors"].get(stage, 0)
+            print(f"{stage}: {s['total_s']}s total, {s['count']}x, mean {s['mean_ms']}ms, "
+                  f"max {s['max_ms']}ms, {errors} errors", file=stream)
+        for stage, errors in summary["errors"].items():
+            if stage not in summary["stages"]:
+                print(f"{stage}: {errors} errors", file=stream)
+        return summary
+
+
+METRICS = RunMetrics()
+span = METRICS.span
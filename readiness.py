@@ -0,0 +1,173 @@
+import time
+from contextlib import contextmanager
+
+# Event-driven readiness: instead of fixed time.sleep() calls, wait on the
+# specific DOM condition a step needs (with a timeout) and record how long
+# each wait took, so WAIT_STATS shows where the wall-clock time goes.
+
+# ---------- Conditions ----------
+
+RESULTS_NAV_SELECTOR = "xpath=/html/body/div/div[2]/main/div[1]/nav/a[1]"
+LISTING_ROW_XPATH = "/html/body/div/div[2]/main/div[2]/div[1]/div[1]/a[1]"
+
+# Chart legend shows the "Median PE = ..." label once the PE dataset is drawn
+CHART_LEGEND_READY_JS = """
+() => Array.from(document.querySelectorAll("#chart-legend > label")).some(
+    (l) => /median/i.test(l.innerText) && /pe/i.test(l.innerText))
+"""
+
+# Quarterly shareholding tab is active and its table is displayed
+QUARTERLY_SHP_READY_JS = """
+() => {
+    const btn = document.querySelector('section#shareholding button[data-tab-id="quarterly-shp"]');
+    const table = document.querySelector("section#shareholding #quarterly-shp table.data-table");
+    return !!(btn && btn.classList.contains("active") && table && table.offsetParent !== null);
+}
+"""
+
+# First listing row links somewhere other than before the pagination click
+LISTING_SWAPPED_JS = """
+([xpath, previousHref]) => {
+    const a = document.evaluate(xpath, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return !!a && a.getAttribute("href") !== previousHref;
+}
+"""
+
+
+# ---------- Wait-time metric ----------
+
+class WaitStats:
+    """Per-label wait durations and timeout counts."""
+
+    def __init__(self):
+        self.waits = {}   # label -> list of (seconds, ready)
+
+    @contextmanager
+    def timed(self, label):
+        start = time.monotonic()
+        outcome = {"ready": False}
+        try:
+            yield outcome
+        finally:
+            self.waits.setdefault(label, []).append(
+                (time.monotonic() - start, outcome["ready"])
+            )
+
+    def summary(self):
+        out = {}
+        for label, entries in self.waits.items():
+            durations = [d for d, _ in entries]
+            out[label] = {
+                "count": len(entries),
+                "timeouts": sum(1 for _, ready in entries if not ready),
+                "total_s": round(sum(durations), 3),
+                "max_s": round(max(durations), 3),
+            }
+        return out
+
+    def report(self):
+        print("\n==== WAIT TIMES ====")
+        for label, s in sorted(self.summary().items(), key=lambda kv: -kv[1]["total_s"]):
+            print(f"{label}: {s['count']} waits, {s['total_s']}s total, "
+                  f"max {s['max_s']}s, {s['timeouts']} timeouts")
+
+
+WAIT_STATS = WaitStats()
+
+
+# ---------- Sync waits ----------
+
+def wait_until(page, label, selector=None, js=None, arg=None, timeout=10000, stats=WAIT_STATS):
+    """
+    Wait for `selector` to be visible or the JS predicate `js(arg)` to be
+    truthy. Returns True when ready, False on timeout.
+    """
+    with stats.timed(label) as outcome:
+        try:
+            if selector is not None:
+                page.wait_for_selector(selector, timeout=timeout)
+            else:
+                page.wait_for_function(js, arg=arg, timeout=timeout)
+            outcome["ready"] = True
+        except Exception:
+            pass
+    return outcome["ready"]
+
+
+def wait_for_load(page, label, state="networkidle", timeout=30000, stats=WAIT_STATS):
+    """Timed page.wait_for_load_state; returns False on timeout."""
+    with stats.timed(label) as outcome:
+        try:
+            page.wait_for_load_state(state, timeout=timeout)
+            outcome["ready"] = True
+        except Exception:
+            pass
+    return outcome["ready"]
+
+
+def click_and_wait_for_navigation(page, selector, label, timeout=30000, stats=WAIT_STATS):
+    """
+    Double-click the link `selector` and wait until the navigation it starts
+    has committed, so later waits can't be satisfied by the old document.
+    Returns False if no navigation happened within `timeout`.
+    """
+    with stats.timed(label) as outcome:
+        try:
+            with page.expect_navigation(wait_until="domcontentloaded", timeout=timeout):
+                page.dblclick(selector)
+            outcome["ready"] = True
+        except Exception as e:
+            if "timeout" not in type(e).__name__.lower():
+                raise
+    return outcome["ready"]
+
+
+def wait_for_chart_legend(page, timeout=10000):
+    return wait_until(page, "chart legend", js=CHART_LEGEND_READY_JS, timeout=timeout)
+
+
+def wait_for_quarterly_shp(page, timeout=5000):
+    return wait_until(page, "shareholding tab", js=QUARTERLY_SHP_READY_JS, timeout=timeout)
+
+
+def wait_for_results_nav(page, timeout=30000):
+    return wait_until(page, "results nav", selector=RESULTS_NAV_SELECTOR, timeout=timeout)
+
+
+def wait_for_listing_rows(page, timeout=30000):
+    return wait_until(page, "listing rows", selector=f"xpath={LISTING_ROW_XPATH}", timeout=timeout)
+
+
+def first_listing_href(page):
+    """href of the first listing row, used to detect a pagination swap."""
+    el = page.query_selector(f"xpath={LISTING_ROW_XPATH}")
+    return el.get_attribute("href") if el else None
+
+
+def wait_for_listing_swap(page, previous_href, timeout=30000):
+    """Wait until the listing rows were replaced after a pagination click."""
+    return wait_until(
+        page,
+        "listing page swap",
+        js=LISTING_SWAPPED_JS,
+        arg=[LISTING_ROW_XPATH, previous_href],
+        timeout=timeout,
+    )
+
+
+# ---------- Async waits ----------
+
+async def async_wait_until(page, label, selector=None, js=None, arg=None, timeout=10000,
+                           stats=WAIT_STATS):
+    """Async counterpart of wait_until."""
+    with stats.timed(label) as outcome:
+        try:
+            if selector is not None:
+                await page.wait_for_selector(selector, timeout=timeout)
+            else:
+                await page.wait_for_function(js, arg=arg, timeout=timeout)
+            outcome["ready"] = True
+        except Exception:
+            pass
+    return outcome["ready"]
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Offline record/replay of Screener pages.
+#
+# Record: a Recorder attached to a browser context saves every document /
+# XHR / script response from screener.in (company pages, the results listing
+# and its pagination, chart data, the page JS) into a fixtures directory:
+#
+#   fixtures/manifest.json   {url: {"file", "status", "content_type"[, "location"]}}
+#   fixtures/bodies/<sha1(url)>.body
+#
+# While recording, each new entry is appended to fixtures/manifest.jsonl
+# (one [url, entry] line) rather than rewriting manifest.json per response;
+# Fixtures.save() folds the journal into manifest.json when recording ends,
+# and a journal left by an interrupted recording is read back on load.
+#
+# Replay: install_replay_routes() fulfils a context's requests from those
+# files through Playwright request interception (everything else is aborted,
+# so no network is needed), and FixtureServer serves the same files over a
+# local HTTP server for the HTTP engine and the benchmarks. Scripts are kept
+# so the Chart UI (extract_median_pe) works offline; images, fonts and
+# stylesheets are not recorded.
+
+RECORD_HOST = "screener.in"
+RECORD_TYPES = ("document", "xhr", "fetch", "script")
+
+# Contexts being recorded or replayed. Anything that would fetch pages
+# outside the browser (e.g. the listing harvester's HTTP session) must use
+# the context instead, or the pages miss the fixtures.
+_intercepted = weakref.WeakSet()
+
+
+def is_intercepted(context):
+    """True if `context` has a Recorder or replay routes attached."""
+    return context in _intercepted
+
+
+def fixture_key(url):
+    """URL without its #fragment."""
+    return url.split("#")[0]
+
+
+def _path_key(url):
+    """path?query part of a URL, used when serving fixtures from another host."""
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class Fixtures:
+    """A fixtures directory: manifest + response bodies."""
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.journal_path = os.path.join(root, "manifest.jsonl")
+        os.makedirs(os.path.join(root, "bodies"), exist_ok=True)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        url, entry = json.loads(line)
+                    except ValueError:
+                        continue   # last line of an interrupted write
+                    self.manifest[url] = entry
+        self._journal = None
+        self._by_path = {_path_key(u): u for u in self.manifest}
+        self._lock = threading.Lock()
+
+    def add(self, url, status, content_type, body, location=None):
+        key = fixture_key(url)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".body"
+        entry = {"file": name, "status": status, "content_type": content_type}
+        if location:
+            entry["location"] = location
+        with self._lock:
+            with open(os.path.join(self.root, "bodies", name), "wb") as f:
+                f.write(body)
+            self.manifest[key] = entry
+            self._by_path[_path_key(key)] = key
+            if self._journal is None:
+                self._journal = open(self.journal_path, "a")
+            self._journal.write(json.dumps([key, entry]) + "\n")
+            self._journal.flush()
+
+    def save(self):
+        """Write manifest.json with every entry and drop the journal."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if not os.path.exists(self.journal_path):
+                return
+            tmp = self.manifest_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.manifest, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.manifest_path)
+            os.remove(self.journal_path)
+
+    def lookup(self, url, any_host=False):
+        """(status, content_type, body, location) for `url`, or None if not recorded."""
+        key = fixture_key(url)
+        if key not in self.manifest and any_host:
+            key = self._by_path.get(_path_key(url))
+        entry = self.manifest.get(key) if key else None
+        if entry is None:
+            return None
+        with open(os.path.join(self.root, "bodies", entry["file"]), "rb") as f:
+            return entry["status"], entry["content_type"], f.read(), entry.get("location")
+
+    def urls(self):
+        return sorted(self.manifest)
+
+    def has_scripts(self):
+        """True if page JS was recorded (older fixture sets have none)."""
+        return any("javascript" in e["content_type"] for e in self.manifest.values())
+
+
+# ---------- Record ----------
+
+class Recorder:
+    """Save screener.in document/XHR responses seen by a context into Fixtures."""
+
+    def __init__(self, root):
+        self.fixtures = Fixtures(root)
+
+    def attach(self, context):
+        context.on("response", self._on_response)
+        _intercepted.add(context)
+        return context
+
+    def close(self):
+        """Write the fixtures manifest; call once recording is over."""
+        self.fixtures.save()
+
+    def _on_response(self, response):
+        request = response.request
+        if request.method != "GET" or request.resource_type not in RECORD_TYPES:
+            return
+        if RECORD_HOST not in urlsplit(response.url).netloc:
+            return
+        if response.status >= 400:
+            return
+        location = None
+        if 300 <= response.status < 400:
+            # e.g. /company/X/ -> /company/X/consolidated/; keep the hop so replay follows it
+            body, location = b"", response.headers.get("location")
+        else:
+            try:
+                body = response.body()
+            except Exception:
+                return
+        self.fixtures.add(
+            response.url,
+            response.status,
+            response.headers.get("content-type", "text/html; charset=utf-8"),
+            body,
+            location,
+        )
+
+
+# ---------- Replay (request interception) ----------
+
+def install_replay_routes(context, root, allow_network=False):
+    """
+    Fulfil every request of `context` from the fixtures in `root`. Requests
+    with no fixture are aborted (or passed through if allow_network).
+    """
+    fixtures = Fixtures(root)
+
+    def handle(route):
+        hit = fixtures.lookup(route.request.url) if route.request.method == "GET" else None
+        if hit is None:
+            if allow_network:
+                route.continue_()
+            else:
+                route.abort()
+            return
+        status, content_type, body, location = hit
+        headers = {"location": location} if location else None
+        route.fulfill(status=status, content_type=content_type, body=body, headers=headers)
+
+    context.route("**/*", handle)
+    _intercepted.add(context)
+    return fixtures
+
+
+# ---------- Replay (local HTTP server) ----------
+
+class FixtureServer:
+    """
+    Serve a fixtures directory on 127.0.0.1 by path, whatever host the
+    fixtures were recorded from: /company/531802/ -> the recorded page.
+    """
+
+    def __init__(self, root, port=0):
+        fixtures = Fixtures(root)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hit = fixtures.lookup(self.path, any_host=True)
+                if hit is None:
+                    self.send_error(404)
+                    return
+                status, content_type, body, location = hit
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if location:
+                    self.send_header("Location", _path_key(location))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.fixtures = fixtures
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------- CLI ----------
+
+def _record(root, urls):
+    from playwright.sync_api import sync_playwright
+    from results_scraper import fetch_median_pe
+
+    user_data_dir = os.path.join(os.getcwd(), "user_data")
+    with sync_playwright() as p:
+        context = p.chromium.launch_persistent_context(user_data_dir, headless=True)
+        recorder = Recorder(root)
+        recorder.attach(context)
+        page = context.new_page()
+        for url in urls:
+            print("Recording", url)
+            page.goto(url)
+            page.wait_for_load_state("networkidle")
+            if "/company/" in url:
+                # Save the PE chart data the Median PE lookup requests
+                fetch_median_pe(page)
+        context.close()
+        recorder.close()
+
+
+def _replay(root, urls):
+    from playwright.sync_api import sync_playwright
+    from results_scraper import results_page_scraper
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context()
+        install_replay_routes(context, root)
+        page = context.new_page()
+        for url in urls:
+            results_page_scraper(page, url=url)
+        browser.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record / replay Screener pages for offline runs.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="visit URLs with the user_data profile and save them")
+    rec.add_argument("root")
+    rec.add_argument("urls", nargs="+")
+    rep = sub.add_parser("replay", help="run results_page_scraper offline against saved pages")
+    rep.add_argument("root")
+    rep.add_argument("urls", nargs="*")
+    srv = sub.add_parser("serve", help="serve saved pages on a local HTTP server")
+    srv.add_argument("root")
+    srv.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        _record(args.root, args.urls)
+    elif args.cmd == "replay":
+        _replay(args.root, args.urls or [
+            u for u in Fixtures(args.root).urls() if "/company/" in u and "/api/" not in u
+        ])
+    else:
+        server = FixtureServer(args.root, port=args.port)
+        print(f"Serving {args.root} on {server.base_url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            sys.exit(0)
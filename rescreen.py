@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from batch_classifier import classify_batch
+from company_result import CompanyResult
+from rules import load_ruleset
+from sheet_writer import SHEET_COLUMNS
+
+# Re-screen stored raw results under another rule set (rules.py) without
+# scraping again, and report which stocks change classification. The store
+# is the SQLite file or Parquet directory written by sinks.SQLiteSink /
+# sinks.ParquetSink; both keep the full raw result of every company. The
+# results are loaded as company_result.CompanyResult records, which keep what
+# the classifiers read in about a third of the memory of the dicts.
+
+
+def _sqlite_records(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT trade_day, trade_date, company_code, stock_name, result, classification"
+        " FROM results"
+    ).fetchall()
+    conn.close()
+    return [
+        {
+            "trade_day": day,
+            "trade_date": trade_date,
+            "company_code": code,
+            "stock_name": name,
+            "result": CompanyResult.from_dict(json.loads(result)),
+            "classification": json.loads(cls) if cls else None,
+        }
+        for day, trade_date, code, name, result, cls in rows
+    ]
+
+
+def _parquet_records(root):
+    import pyarrow.parquet as pq
+
+    from sinks import ParquetSink, trade_day_key
+
+    records = {}
+    for row in pq.read_table(root).to_pylist():
+        result = {name: row.get(name) for name in ParquetSink.SERIES + ParquetSink.SCALARS}
+        result["opm_percent"] = row.get("opm_percent")
+        # Parts written before trade_day existed: the year is the scrape's
+        day = row.get("trade_day") or trade_day_key(
+            row["trade_date"], datetime.fromisoformat(row["scraped_at"]).date()
+        )
+        # Later parts win: a rescrape replaces the earlier row
+        records[(day, row["company_code"])] = {
+            "trade_day": day,
+            "trade_date": row["trade_date"],
+            "company_code": row["company_code"],
+            "stock_name": row["stock_name"],
+            "result": CompanyResult.from_dict(result),
+            "classification": json.loads(row["classification"]) if row["classification"] else None,
+        }
+    return list(records.values())
+
+
+def load_store(path, trade_dates=None):
+    """
+    Stored records (result as a CompanyResult + emitted classification),
+    optionally for some trade dates only ('14 November' for its latest
+    occurrence, or ISO dates).
+    """
+    from sinks import trade_day_key
+
+    records = _parquet_records(path) if os.path.isdir(path) else _sqlite_records(path)
+    if trade_dates:
+        days = {trade_day_key(d) for d in trade_dates}
+        records = [r for r in records if r["trade_day"] in days]
+    return records
+
+
+def _outcome(row):
+    """'Best | Fair valuation' for an accepted row, 'rejected' for None."""
+    return "rejected" if row is None else row[SHEET_COLUMNS.index("Remarks")]
+
+
+def rescreen(records, new_rules, old_rules=None):
+    """
+    Classify `records` under `new_rules` and compare with `old_rules` (or,
+    when None, with the classification stored at scrape time). Returns
+    (new_rows, changes) where changes lists every record whose outcome moved.
+    """
+    results = [r["result"] for r in records]
+    names = [r["stock_name"] for r in records]
+    dates = [r["trade_date"] for r in records]
+    new_rows = classify_batch(results, names, dates, new_rules)
+    if old_rules is not None:
+        old_rows = classify_batch(results, names, dates, old_rules)
+    else:
+        old_rows = [
+            [r["classification"][c] for c in SHEET_COLUMNS] if r["classification"] else None
+            for r in records
+        ]
+
+    changes = []
+    for record, old, new in zip(records, old_rows, new_rows):
+        if _outcome(old) != _outcome(new):
+            changes.append({
+                "trade_day": record["trade_day"],
+                "trade_date": record["trade_date"],
+                "company_code": record["company_code"],
+                "stock_name": record["stock_name"],
+                "old": _outcome(old),
+                "new": _outcome(new),
+            })
+    return new_rows, changes
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Re-screen stored results under another rule set.")
+    parser.add_argument("store", help="results.sqlite file or Parquet directory")
+    parser.add_argument("--new", required=True, help="rule set version or JSON file to apply")
+    parser.add_argument("--old", help="rule set to compare against (default: stored classification)")
+    parser.add_argument("--date", action="append", dest="dates", metavar="TRADE_DATE",
+                        help='only these trade dates, e.g. "14 November" or 2025-11-14 (repeatable)')
+    parser.add_argument("--out", help="write the changes here as JSON")
+    args = parser.parse_args()
+
+    records = load_store(args.store, args.dates)
+    new_rules = load_ruleset(args.new)
+    old_rules = load_ruleset(args.old) if args.old else None
+
+    start = time.perf_counter()
+    new_rows, changes = rescreen(records, new_rules, old_rules)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(records)} stored results re-screened with {new_rules['version']} "
+          f"in {elapsed:.3f}s; {len(changes)} changed classification.")
+    for change in changes:
+        print(f"{change['trade_day']:<12}{change['stock_name'] or change['company_code']:<40}"
+              f"{change['old']:<32} -> {change['new']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(changes, f, indent=2)
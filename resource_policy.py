@@ -0,0 +1,93 @@
+import re
+import weakref
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Request-routing policy for scraping contexts. The extractors only read the
+# server-rendered tables, so images, media, fonts and third-party trackers
+# are aborted, and so are the chart assets (charting JS and chart data XHRs)
+# except on pages where the Median PE fallback actually needs them (see
+# charts_allowed). Everything else falls through to earlier routes (replay,
+# snapshot cache) or the network.
+
+BLOCKED_TYPES = ("image", "media", "font")
+TRACKER_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+    "mixpanel.com",
+    "segment.io",
+)
+# Chart data endpoint and charting scripts (chart.js, chartjs-plugin-*.js ...),
+# matched on the URL path of script / XHR requests only, so documents and
+# company slugs containing "chart" are never blocked
+CHART_TYPES = ("script", "xhr", "fetch")
+CHART_PATH_RE = re.compile(r"^/api/company/\d+/chart/|/chart[^/]*\.js$", re.I)
+
+_policies = weakref.WeakKeyDictionary()   # context -> BlockPolicy installed on it
+
+
+class BlockPolicy:
+    def __init__(self, blocked_types=BLOCKED_TYPES, tracker_hosts=TRACKER_HOSTS,
+                 block_charts=True):
+        self.blocked_types = set(blocked_types)
+        self.tracker_hosts = tuple(tracker_hosts)
+        self.block_charts = block_charts
+        self.chart_pages = weakref.WeakSet()
+        self.blocked = 0
+
+    def should_block(self, request):
+        if request.resource_type in self.blocked_types:
+            return True
+        host = urlsplit(request.url).netloc.lower()
+        if any(host == h or host.endswith("." + h) for h in self.tracker_hosts):
+            return True
+        if (self.block_charts and request.resource_type in CHART_TYPES
+                and CHART_PATH_RE.search(urlsplit(request.url).path)):
+            try:
+                return request.frame.page not in self.chart_pages
+            except Exception:
+                return True
+        return False
+
+    def handle(self, route):
+        if self.should_block(route.request):
+            self.blocked += 1
+            route.abort()
+        else:
+            route.fallback()
+
+    def install(self, context):
+        context.route("**/*", self.handle)
+        _policies[context] = self
+        return context
+
+
+def install_block_policy(context, **kwargs):
+    """Apply a BlockPolicy (default profile unless overridden) to `context`."""
+    return BlockPolicy(**kwargs).install(context)
+
+
+def charts_blocked(page):
+    """True if the page's context blocks chart assets for this page."""
+    policy = _policies.get(page.context)
+    return policy is not None and policy.block_charts and page not in policy.chart_pages
+
+
+@contextmanager
+def charts_allowed(page):
+    """Let chart assets through for `page` while the block is active."""
+    policy = _policies.get(page.context)
+    if policy is None:
+        yield
+        return
+    policy.chart_pages.add(page)
+    try:
+        yield
+    finally:
+        policy.chart_pages.discard(page)
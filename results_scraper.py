@@ -1,28 +1,15 @@
-from playwright.sync_api import sync_playwright
 import re
-import os
-import time
+import statistics
+from dataclasses import dataclass, field
+from urllib.parse import quote_plus, urlsplit
 
 
-from google.oauth2.service_account import Credentials
-import gspread
-
-# ====== GOOGLE SHEETS CONFIG ======
-SERVICE_ACCOUNT_FILE = "keys.json"        # path to your service account JSON
-SHEET_ID = "1GrNsCpFHJ2XtSHw_DgI-_PORGKhBi1tkTSQyALJnKoQ"           # <<< put your sheet ID here
-
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-]
-
-_creds = Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_FILE,
-    scopes=SCOPES,
-)
-_gclient = gspread.authorize(_creds)
-_sheet = _gclient.open_by_key(SHEET_ID).sheet1
-# ==================================
+from sheet_writer import SheetWriter, get_default_writer
+from sinks import close_sinks, make_record, write_record
+from metrics import METRICS, span
+from rules import DEFAULT_RULES
+from resource_policy import charts_allowed, charts_blocked
+from readiness import WAIT_STATS, wait_for_chart_legend, wait_for_quarterly_shp, wait_until
 
 # ---------- Generic helpers ----------
 def pct_change(curr, prev):
@@ -53,6 +40,15 @@ def clean_to_float(text: str, decimals: int = 2):
         return None
 
 
+def opm_to_float(v):
+    """An OPM % value ('12%', 12.0, '-' or None) as a float, or None."""
+    if v in (None, "", "-"):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    return clean_to_float(str(v), decimals=None)
+
+
 def extract_first_number(text: str, decimals: int = 2):
     """Use regex to extract the first numeric token from a string, like Script 1's extract_float_2dp."""
     if not text:
@@ -83,6 +79,14 @@ def last_n_numeric(values, n=5):
 
 # ---------- Quarterly results (Sales, Other Income, OPM%, Net Profit) ----------
 
+QUARTERLY_LABELS = {
+    "sales": "sales",
+    "other_income": "other income",
+    "opm_percent": "opm",
+    "net_profit": "net profit",
+}
+
+
 def find_row_in_tables(section, label_substring: str):
     """
     Search all tables inside a section for a row whose first cell contains label_substring.
@@ -100,64 +104,63 @@ def find_row_in_tables(section, label_substring: str):
     return None
 
 
+def find_row(rows, label_substring: str):
+    """
+    Plain-list counterpart of find_row_in_tables: `rows` is a list of rows,
+    each a list of cell texts. Returns the first row whose first cell
+    contains label_substring, or None.
+    """
+    if not rows:
+        return None
+    needle = label_substring.lower()
+    for cells in rows:
+        if cells and needle in cells[0].strip().lower():
+            return [c.strip() for c in cells]
+    return None
+
+
+def _quarterly_from_lookup(lookup):
+    """Build the quarterly dict from `lookup(label) -> row cells or None`."""
+    quarterly = {}
+    for key, label in QUARTERLY_LABELS.items():
+        row = lookup(label)
+        if not row:
+            quarterly[key] = [None] * 5
+            continue
+        vals_raw = last_n_numeric(row[1:], n=5)  # skip label
+        if key == "opm_percent":
+            # Keep as raw "% strings", but normalized None where blank
+            quarterly[key] = [v if v not in ("", "-") else None for v in vals_raw]
+        else:
+            quarterly[key] = [clean_to_float(v) for v in vals_raw]
+    return quarterly
+
+
 def extract_quarterly_financials(page):
     """Extract last 5 quarters of Sales, Other Income, OPM%, Net Profit from the Quarters section."""
     page.wait_for_selector("section#quarters", timeout=10000)
     qr_section = page.query_selector("section#quarters")
     if not qr_section:
-        return {
-            "sales": [None] * 5,
-            "other_income": [None] * 5,
-            "opm_percent": [None] * 5,
-            "net_profit": [None] * 5,
-        }
-
-    # Sales row (from main quarterly table)
-    sales_row = find_row_in_tables(qr_section, "sales")
-    if sales_row:
-        sales_cells = sales_row[1:]  # skip label
-        sales_vals_raw = last_n_numeric(sales_cells, n=5)
-        sales_vals = [clean_to_float(v) for v in sales_vals_raw]
-    else:
-        sales_vals = [None] * 5
-
-    # Other Income row
-    oi_row = find_row_in_tables(qr_section, "other income")
-    if oi_row:
-        oi_cells = oi_row[1:]
-        oi_vals_raw = last_n_numeric(oi_cells, n=5)
-        other_income_vals = [clean_to_float(v) for v in oi_vals_raw]
-    else:
-        other_income_vals = [None] * 5
-
-    # Net Profit row
-    np_row = find_row_in_tables(qr_section, "net profit")
-    if np_row:
-        np_cells = np_row[1:]
-        np_vals_raw = last_n_numeric(np_cells, n=5)
-        net_profit_vals = [clean_to_float(v) for v in np_vals_raw]
-    else:
-        net_profit_vals = [None] * 5
-
-    # OPM % row (often in a separate margins table under the same section)
-    opm_row = find_row_in_tables(qr_section, "opm")
-    if opm_row:
-        opm_cells = opm_row[1:]
-        opm_vals_raw = last_n_numeric(opm_cells, n=5)
-        # Keep as raw "% strings", but normalized None where blank
-        opm_percent_vals = [v if v not in ("", "-") else None for v in opm_vals_raw]
-    else:
-        opm_percent_vals = [None] * 5
+        return _quarterly_from_lookup(lambda label: None)
+
+    # OPM % row is often in a separate margins table under the same section
+    return _quarterly_from_lookup(lambda label: find_row_in_tables(qr_section, label))
 
-    return {
-        "sales": sales_vals,
-        "other_income": other_income_vals,
-        "opm_percent": opm_percent_vals,
-        "net_profit": net_profit_vals,
-    }
 
+def parse_quarterly_financials(rows):
+    """Same as extract_quarterly_financials, over the serialized `quarters` rows."""
+    return _quarterly_from_lookup(lambda label: find_row(rows, label))
+
+
+# ---------- Balance Sheet (Borrowings) / Cash Flow (Cash from Operating Activity) ----------
+
+def _last_two_values(row):
+    """Last 2 numeric values of a row (label cell included), oldest -> newest."""
+    if not row:
+        return [None, None]
+    last_two_raw = last_n_numeric(row[1:], n=2)
+    return [clean_to_float(v) for v in last_two_raw]
 
-# ---------- Balance Sheet (Borrowings) ----------
 
 def extract_recent_borrowings(page):
     """
@@ -168,23 +171,13 @@ def extract_recent_borrowings(page):
     bs_section = page.query_selector("section#balance-sheet")
     if not bs_section:
         return [None, None]
+    return _last_two_values(find_row_in_tables(bs_section, "borrowings"))
 
-    tables = bs_section.query_selector_all("table")
-    for tbl in tables:
-        for tr in tbl.query_selector_all("tr"):
-            cells = tr.query_selector_all("td, th")
-            if not cells:
-                continue
-            first = cells[0].inner_text().strip().lower()
-            if "borrowings" in first:
-                value_cells = [c.inner_text().strip() for c in cells[1:]]
-                last_two_raw = last_n_numeric(value_cells, n=2)
-                last_two = [clean_to_float(v) for v in last_two_raw]
-                return last_two
-    return [None, None]
 
+def parse_recent_borrowings(rows):
+    """Same as extract_recent_borrowings, over the serialized `balance-sheet` rows."""
+    return _last_two_values(find_row(rows, "borrowings"))
 
-# ---------- Cash Flow (Cash from Operating Activity) ----------
 
 def extract_recent_cash_from_ops(page):
     """
@@ -195,24 +188,34 @@ def extract_recent_cash_from_ops(page):
     cf_section = page.query_selector("section#cash-flow")
     if not cf_section:
         return [None, None]
+    return _last_two_values(find_row_in_tables(cf_section, "cash from operating activity"))
 
-    tables = cf_section.query_selector_all("table")
-    for tbl in tables:
-        for tr in tbl.query_selector_all("tr"):
-            cells = tr.query_selector_all("td, th")
-            if not cells:
-                continue
-            first = cells[0].inner_text().strip().lower()
-            if "cash from operating activity" in first:
-                value_cells = [c.inner_text().strip() for c in cells[1:]]
-                last_two_raw = last_n_numeric(value_cells, n=2)
-                last_two = [clean_to_float(v) for v in last_two_raw]
-                return last_two
-    return [None, None]
+
+def parse_recent_cash_from_ops(rows):
+    """Same as extract_recent_cash_from_ops, over the serialized `cash-flow` rows."""
+    return _last_two_values(find_row(rows, "cash from operating activity"))
 
 
 # ---------- Working Capital Days ----------
 
+def _working_capital_days_from_row(row):
+    """[latest, prev] Working Capital Days from a row (label cell included)."""
+    if not row:
+        return [None, None]
+    value_texts = row[1:]
+    if not value_texts:
+        return [None, None]
+
+    # You currently return [latest, prev]; keep as-is if you're happy.
+    latest_raw = value_texts[-1]
+    prev_raw = value_texts[-2] if len(value_texts) >= 2 else None
+
+    latest = clean_to_float(latest_raw)
+    prev = clean_to_float(prev_raw) if prev_raw is not None else None
+
+    return [latest, prev]
+
+
 def extract_recent_working_capital_days(page):
     """
     Extract most recent and previous 'Working Capital Days' from the Ratios section.
@@ -230,45 +233,27 @@ def extract_recent_working_capital_days(page):
     if not ratios_section:
         return [None, None]
 
-    tables = ratios_section.query_selector_all("table")
-    if not tables:
-        return [None, None]
-
-    for tbl in tables:
-        for tr in tbl.query_selector_all("tr"):
-            cells = tr.query_selector_all("td, th")
-            if not cells:
-                continue
-
-            first_text = cells[0].inner_text().strip().lower()
-            if "working capital days" in first_text:
-                value_texts = [c.inner_text().strip() for c in cells[1:]]
-                if not value_texts:
-                    return [None, None]
-
-                # You currently return [latest, prev]; keep as-is if you're happy.
-                latest_raw = value_texts[-1]
-                prev_raw = value_texts[-2] if len(value_texts) >= 2 else None
-
-                latest = clean_to_float(latest_raw)
-                prev = clean_to_float(prev_raw) if prev_raw is not None else None
+    return _working_capital_days_from_row(
+        find_row_in_tables(ratios_section, "working capital days")
+    )
 
-                return [latest, prev]
 
-    return [None, None]
+def parse_recent_working_capital_days(rows):
+    """Same as extract_recent_working_capital_days, over the serialized `ratios` rows."""
+    return _working_capital_days_from_row(find_row(rows, "working capital days"))
 
 
 # ---------- Top Ratios (Market Cap, Stock PE, Industry PE) ----------
 
-def extract_marketcap_stockpe_industrype(page):
+def parse_top_ratios(ratios_text, top_ratio_items):
     """
-    Extract Market Cap, Stock PE, Industry PE from the top ratios block.
+    Market Cap, Stock PE, Industry PE from the inner text of the company
+    ratios block, falling back to the positional `#top-ratios` <li> texts.
     """
-    ratios_div = page.query_selector("#top > div.company-info > div.company-ratios")
     marketcap = stock_pe = industry_pe = None
 
-    if ratios_div:
-        lines = [l.strip() for l in ratios_div.inner_text().splitlines() if l.strip()]
+    if ratios_text:
+        lines = [l.strip() for l in ratios_text.splitlines() if l.strip()]
         last_label = None
         for line in lines:
             low = line.lower()
@@ -290,27 +275,39 @@ def extract_marketcap_stockpe_industrype(page):
                 last_label = "industry p/e"
 
     # Fallback using positional #top-ratios
+    items = top_ratio_items or []
+    if marketcap is None and len(items) >= 1:
+        marketcap = extract_first_number(items[0])
+    if stock_pe is None:
+        for txt in items:
+            if "stock p/e" in txt.lower():
+                stock_pe = extract_first_number(txt)
+                break
+    if industry_pe is None:
+        for txt in items:
+            if "industry p/e" in txt.lower():
+                industry_pe = extract_first_number(txt)
+                break
+
+    return marketcap, stock_pe, industry_pe
+
+
+def extract_marketcap_stockpe_industrype(page):
+    """
+    Extract Market Cap, Stock PE, Industry PE from the top ratios block.
+    """
+    ratios_div = page.query_selector("#top > div.company-info > div.company-ratios")
+    ratios_text = ratios_div.inner_text() if ratios_div else None
+
+    items = []
     try:
         ratios_list = page.query_selector("#top-ratios")
         if ratios_list:
-            items = ratios_list.query_selector_all("li")
-            if marketcap is None and len(items) >= 1:
-                txt = items[0].inner_text()
-                marketcap = extract_first_number(txt)
-            if stock_pe is None:
-                for li in items:
-                    if "stock p/e" in li.inner_text().lower():
-                        stock_pe = extract_first_number(li.inner_text())
-                        break
-            if industry_pe is None:
-                for li in items:
-                    if "industry p/e" in li.inner_text().lower():
-                        industry_pe = extract_first_number(li.inner_text())
-                        break
+            items = [li.inner_text() for li in ratios_list.query_selector_all("li")]
     except Exception:
         pass
 
-    return marketcap, stock_pe, industry_pe
+    return parse_top_ratios(ratios_text, items)
 
 
 # ---------- Median PE from Charts tab ----------
@@ -339,7 +336,7 @@ def extract_promoters_last2(page):
     if not quarter_tab:
         try:
             section.query_selector('button[data-tab-id="quarterly-shp"]').click()
-            time.sleep(1.5)
+            wait_for_quarterly_shp(page)
         except:
             pass
 
@@ -352,8 +349,6 @@ def extract_promoters_last2(page):
     if not rows:
         return [None, None]
 
-    promoters_row = None
-
     # Find promoters row using FIRST <td> text (not the button)
     for tr in rows:
         first_cell = tr.query_selector("td.text")
@@ -362,16 +357,15 @@ def extract_promoters_last2(page):
 
         txt = first_cell.inner_text().strip().lower()
         if "promoters" in txt:
-            promoters_row = tr
-            break
+            # Extract promoter % values from <td> cells (skip first label cell)
+            cells = tr.query_selector_all("td")[1:]
+            return _promoters_from_cells([c.inner_text().strip() for c in cells])
 
-    if promoters_row is None:
-        return [None, None]
+    return [None, None]
 
-    # Extract promoter % values from <td> cells (skip first label cell)
-    cells = promoters_row.query_selector_all("td")[1:]
-    vals = [c.inner_text().strip() for c in cells]
 
+def _promoters_from_cells(vals):
+    """Last 2 promoter % values (label cell excluded) as [prev, curr]."""
     # Only numeric-like values
     numeric = []
     for v in reversed(vals):
@@ -387,19 +381,23 @@ def extract_promoters_last2(page):
     # reverse to chronological → [prev, curr]
     return list(reversed(numeric))
 
+
+def parse_promoters_last2(rows):
+    """Same as extract_promoters_last2, over the serialized quarterly shareholding rows."""
+    row = find_row(rows, "promoters")
+    if not row:
+        return [None, None]
+    return _promoters_from_cells(row[1:])
+
 def extract_median_pe(page):
     """Navigate to Charts, PE Ratio, then extract the Median PE from the bottom of the graph."""
     try:
         page.click('text="Chart"')
     except:
         return None
-    time.sleep(2)
 
-    try:
-        page.wait_for_selector("#company-chart-metrics", timeout=5000)
-    except:
+    if not wait_until(page, "chart metrics", selector="#company-chart-metrics", timeout=5000):
         return None
-    time.sleep(2)
 
     try:
         pe_button = page.query_selector('button:has-text("PE")')
@@ -416,13 +414,10 @@ def extract_median_pe(page):
                     break
     except:
         pass
-    time.sleep(2)
 
-    try:
-        page.wait_for_selector("#chart-legend", timeout=5000)
-    except:
+    # Legend gets its "Median PE = ..." label once the PE dataset is drawn
+    if not wait_for_chart_legend(page):
         return None
-    time.sleep(2)
 
     labels = page.query_selector_all("#chart-legend > label")
     median_pe = None
@@ -439,34 +434,108 @@ def extract_median_pe(page):
             break
 
     return median_pe
-def classify_and_append_to_sheet(
-    result: dict,
-    stock_name: str,
-    trade_date_str: str,
-    sheet=_sheet
-):
+
+
+# ---------- Median PE from the chart data endpoint ----------
+
+# The PE chart draws this endpoint's JSON; computing the median from it needs
+# no chart UI. `days` is the period the chart opens with (1Yr).
+CHART_API_PATH = "/api/company/{warehouse_id}/chart/?q={query}&days={days}"
+MEDIAN_PE_QUERY = "Price to Earning-Median PE-EPS"
+MEDIAN_PE_DAYS = 365
+
+WAREHOUSE_ID_JS = """
+() => {
+    const el = document.querySelector("[data-warehouse-id]");
+    return el ? el.getAttribute("data-warehouse-id") : null;
+}
+"""
+
+CHART_FETCH_JS = """
+async (url) => {
+    const resp = await fetch(url, {credentials: "same-origin",
+                                   headers: {"X-Requested-With": "XMLHttpRequest"}});
+    return resp.ok ? await resp.json() : null;
+}
+"""
+
+
+def chart_api_url(company_url, warehouse_id, days=MEDIAN_PE_DAYS, query=MEDIAN_PE_QUERY):
+    """Chart data URL for the company page at `company_url` (same host, standalone/consolidated)."""
+    parts = urlsplit(company_url)
+    url = f"{parts.scheme}://{parts.netloc}" + CHART_API_PATH.format(
+        warehouse_id=warehouse_id, query=quote_plus(query), days=days
+    )
+    if "/consolidated" in parts.path:
+        url += "&consolidated=true"
+    return url
+
+
+def median_pe_from_chart(data):
     """
-    Given the scraped `result` dict and stock metadata, apply filters and
-    classification rules. If the stock passes filters, append a row to
-    Google Sheets and return True. If filtered out, return False.
-
-    Columns written (suggested header row):
-
-    ["Date",
-     "Stock Name",
-     "Market Cap (Cr)",
-     "Stock PE",
-     "Industry/Median PE",
-     "Result Type",
-     "Valuation",
-     "Sales vs last 4",
-     "Profit (NP-OI) vs last 4",
-     "OPM comment",
-     "Borrowings trend",
-     "WC days trend",
-     "CFO trend",
-     "Remarks"]
+    Median of the "Price to Earning" series of a chart JSON response
+    ({"datasets": [{"metric": ..., "values": [[date, value], ...]}, ...]}),
+    or the value of its "Median PE" series when the PE series is missing.
+    """
+    datasets = (data or {}).get("datasets") or []
+    for ds in datasets:
+        if (ds.get("metric") or "").lower() == "price to earning":
+            values = [clean_to_float(str(v[1]), decimals=None) for v in ds.get("values") or []
+                      if len(v) > 1 and v[1] is not None]
+            values = [v for v in values if v is not None]
+            if values:
+                return round(statistics.median(values), 2)
+    for ds in datasets:
+        if "median" in (ds.get("metric") or "").lower():
+            number = extract_first_number(ds.get("label") or "")
+            if number is not None:
+                return number
+            values = ds.get("values") or []
+            if values and len(values[-1]) > 1:
+                return clean_to_float(str(values[-1][1]))
+    return None
+
+
+def fetch_median_pe(page, days=MEDIAN_PE_DAYS):
+    """Median PE from the chart data endpoint, fetched from inside `page`; None if unavailable."""
+    try:
+        warehouse_id = page.evaluate(WAREHOUSE_ID_JS)
+        if not warehouse_id:
+            return None
+        with charts_allowed(page):
+            data = page.evaluate(CHART_FETCH_JS, chart_api_url(page.url, warehouse_id, days))
+    except Exception as e:
+        print("Chart data fetch failed:", e)
+        return None
+    return median_pe_from_chart(data)
+
+
+@dataclass(frozen=True)
+class Decision:
+    """Outcome of classify(): why a stock was rejected, or how it was classified."""
+    accepted: bool
+    reason: str = None               # rejection reason, None when accepted
+    result_type: str = None          # Good / Best / Solid
+    valuation: str = None            # Over / Fair / Under valuation, Unknown
+    marketcap: float = None
+    stock_pe: float = None
+    base_pe: float = None            # Industry PE, or Median PE when missing
+    comments: dict = field(default_factory=dict)   # sales/profit/opm/borrow/wc/cfo
+
+
+def _rejected(reason, marketcap=None, stock_pe=None):
+    return Decision(accepted=False, reason=reason, marketcap=marketcap, stock_pe=stock_pe)
+
+
+def classify(result: dict, rules: dict = None) -> Decision:
     """
+    Apply the filters and classification rules to a scraped `result` dict.
+    Pure: no I/O, so it can run anywhere (off the scraping threads, over a
+    local store of raw results ...). See decision_row for the sheet row.
+
+    `rules` is a rule set from rules.py (thresholds); default is the current one.
+    """
+    rules = rules or DEFAULT_RULES
 
     sales = result.get("sales") or []
     other_income = result.get("other_income") or []
@@ -486,7 +555,7 @@ def classify_and_append_to_sheet(
     # Filter rule: If promoters == 0 in either of last 2 quarters → reject stock
     if prom_prev is not None and prom_curr is not None:
         if prom_prev == 0 or prom_curr == 0:
-            return False
+            return _rejected("promoter holding is 0", marketcap, stock_pe)
 
     # ---------- Derive helper series ----------
     # NP - OtherIncome per quarter (same length as net_profit/other_income)
@@ -522,22 +591,23 @@ def classify_and_append_to_sheet(
     if curr_sale is not None and last4_sales:
         for s in last4_sales:
             if s is not None and curr_sale < s:
-                return False  # reject immediately
+                return _rejected("sales below one of the last 4 quarters", marketcap, stock_pe)
 
     # 2. Reject if current core profit < ANY of last 4 quarters
     if curr_profit_core is not None and last4_profit_core:
         for p in last4_profit_core:
             if p is not None and curr_profit_core < p:
-                return False  # reject immediately
+                return _rejected("core profit below one of the last 4 quarters",
+                                 marketcap, stock_pe)
 
     # 3. If market cap < 150 Cr -> ignore
-    if marketcap is not None and marketcap < 125:
-        return False
+    if marketcap is not None and marketcap < rules["min_marketcap"]:
+        return _rejected(f"market cap below {rules['min_marketcap']:g} Cr", marketcap, stock_pe)
 
     # 4. If borrowing (current) > market cap -> ignore
     if curr_borrowing is not None and marketcap is not None:
         if curr_borrowing > marketcap:
-            return False
+            return _rejected("borrowings above market cap", marketcap, stock_pe)
 
     # ---------- RESULT TYPE (Good / Best / Normal) ----------
 
@@ -550,7 +620,7 @@ def classify_and_append_to_sheet(
                 continue
             pc = pct_change(curr_sale, s)
             if pc is not None:
-                comparisons.append(pc > 10.0)
+                comparisons.append(pc > rules["sales_growth_pct"])
         sales_good = bool(comparisons) and all(comparisons)
 
     # Good profit: (NP-OI) > 15% vs immediately previous quarter
@@ -558,7 +628,7 @@ def classify_and_append_to_sheet(
     if curr_profit_core is not None and len(profit_core) >= 2:
         prev_profit_core = profit_core[-2]
         pc = pct_change(curr_profit_core, prev_profit_core)
-        profit_good = pc is not None and pc > 15.0
+        profit_good = pc is not None and pc > rules["profit_growth_pct"]
 
     # Best result criteria:
     #  - OPM% current > all previous 4 values
@@ -568,13 +638,8 @@ def classify_and_append_to_sheet(
         curr_opm = opm_percent[-1]
         prev4_opm = opm_percent[-5:-1] if len(opm_percent) >= 5 else opm_percent[:-1]
         # extract numeric OPM values
-        def _opm_to_float(v):
-            if v in (None, "", "-"):
-                return None
-            return clean_to_float(str(v), decimals=None)
-
-        curr_opm_val = _opm_to_float(curr_opm)
-        prev4_vals = [_opm_to_float(v) for v in prev4_opm]
+        curr_opm_val = opm_to_float(curr_opm)
+        prev4_vals = [opm_to_float(v) for v in prev4_opm]
         if curr_opm_val is not None and prev4_vals:
             best_margins = all(
                 curr_opm_val > v for v in prev4_vals if v is not None
@@ -601,7 +666,7 @@ def classify_and_append_to_sheet(
         diff = stock_pe - ref_pe
         if stock_pe > ref_pe:
             valuation = "Over valuation"
-        if abs(diff) <= 3:
+        if abs(diff) <= rules["fair_pe_band"]:
             valuation = "Fair valuation"
         if stock_pe < ref_pe:
             valuation = "Under valuation"
@@ -610,13 +675,13 @@ def classify_and_append_to_sheet(
 
     # Sales vs last 4 (simple text)
     if sales_good:
-        sales_comment = "Sales >10% vs each of last 4"
+        sales_comment = f"Sales >{rules['sales_growth_pct']:g}% vs each of last 4"
     else:
         sales_comment = "Sales not strongly higher"
 
     # Profit vs last 4
     if profit_good:
-        profit_comment = "Core profit >15% vs last qtr"
+        profit_comment = f"Core profit >{rules['profit_growth_pct']:g}% vs last qtr"
     else:
         profit_comment = "Core profit not strongly higher"
 
@@ -656,103 +721,240 @@ def classify_and_append_to_sheet(
     else:
         cfo_comment = "CFO flat"
 
-    # Remarks: combine best/result/valuation briefly
-    remarks = f"{result_type} | {valuation}"
+    return Decision(
+        accepted=True,
+        result_type=result_type,
+        valuation=valuation,
+        marketcap=marketcap,
+        stock_pe=stock_pe,
+        base_pe=base_pe,
+        comments={
+            "sales": sales_comment,
+            "profit": profit_comment,
+            "opm": opm_comment,
+            "borrowings": borrow_comment,
+            "working_capital": wc_comment,
+            "cash_from_ops": cfo_comment,
+        },
+    )
 
-    # ---------- Build row & append ----------
+
+def decision_row(decision: Decision, stock_name: str, trade_date_str: str):
+    """Sheet row (see SHEET_COLUMNS) for an accepted decision, None for a rejected one."""
+    if not decision.accepted:
+        return None
+    c = decision.comments
+
+    # Remarks: combine best/result/valuation briefly
+    remarks = f"{decision.result_type} | {decision.valuation}"
 
     row = [
         trade_date_str,              # Date (e.g. "10-Nov-2025")
         stock_name,                  # Stock name
-        marketcap,                   # Market Cap (Cr)
-        stock_pe,                    # Stock PE
-        base_pe,                     # Industry / Median PE used for valuation
-        result_type,                 # Result type
-        valuation,                   # Over / Fair / Under
-        sales_comment,               # Sales vs last 4
-        profit_comment,              # Profit metric vs last 4
-        opm_comment,                 # OPM comment
-        borrow_comment,              # Borrowings trend
-        wc_comment,                  # Working capital days trend
-        cfo_comment,                 # Cash from ops trend
+        decision.marketcap,          # Market Cap (Cr)
+        decision.stock_pe,           # Stock PE
+        decision.base_pe,            # Industry / Median PE used for valuation
+        decision.result_type,        # Result type
+        decision.valuation,          # Over / Fair / Under
+        c["sales"],                  # Sales vs last 4
+        c["profit"],                 # Profit metric vs last 4
+        c["opm"],                    # OPM comment
+        c["borrowings"],             # Borrowings trend
+        c["working_capital"],        # Working capital days trend
+        c["cash_from_ops"],          # Cash from ops trend
         remarks,                     # Final remarks
     ]
+    return row
 
 
-    # ----- DUPLICATE CHECK -----
-    existing_records = sheet.get_all_values()
+def classify_result(result: dict, stock_name: str, trade_date_str: str):
+    """
+    Apply the filters and classification rules to a scraped `result` dict.
+    Returns the sheet row (see SHEET_COLUMNS) if the stock passes the
+    filters, or None if it is filtered out.
+    """
+    return decision_row(classify(result), stock_name, trade_date_str)
+
+
+def classify_and_append_to_sheet(
+    result: dict,
+    stock_name: str,
+    trade_date_str: str,
+    sheet=None
+):
+    """
+    Given the scraped `result` dict and stock metadata, apply filters and
+    classification rules. If the stock passes filters, queue a row on the
+    batched SheetWriter `sheet` and return True. If filtered out or already
+    in the sheet, return False. `sheet` defaults to the shared, lazily
+    authorized writer (see sheet_writer.get_default_writer); a plain
+    worksheet is wrapped in an unbatched SheetWriter.
 
-    for r in existing_records:
-        if len(r) >= 2:
-            existing_date = r[0].strip()
-            existing_stock = r[1].strip()
+    Columns written (suggested header row): sheet_writer.SHEET_COLUMNS
+    """
+    row = classify_result(result, stock_name, trade_date_str)
+    if row is None:
+        return False
 
-            if existing_date == trade_date_str and existing_stock.lower() == stock_name.lower():
-                print(f"Duplicate found for {stock_name} on {trade_date_str} — skipping.")
-                return False  # Do NOT append the row
+    # ----- DUPLICATE CHECK + BATCHED APPEND -----
+    if sheet is None:
+        sheet = get_default_writer()
+    elif not hasattr(sheet, "append"):
+        sheet = SheetWriter(sheet, batch_size=1)
+    return sheet.append(row)
+
+
+# ---------- Bulk extraction (one page.evaluate per company) ----------
+
+SECTION_IDS = ("quarters", "balance-sheet", "cash-flow", "ratios")
+# Sections kept in full (every row, every period) when history is requested
+HISTORY_SECTION_IDS = ("quarters", "profit-loss", "balance-sheet", "cash-flow", "ratios")
+
+# Serializes every table we parse plus the top ratios block in one in-page
+# call, instead of one inner_text() round trip per cell. Only a section's
+# period tables (table.data-table) are read when it has any: #profit-loss
+# also holds the compounded-growth "ranges" tables (10 Years:, TTM: ...).
+PAGE_PAYLOAD_JS = """
+(sectionIds) => {
+    const text = (el) => (el.innerText || el.textContent || "").trim();
+    const tableRows = (root) => {
+        const rows = [];
+        let tables = root.querySelectorAll("table.data-table");
+        if (!tables.length) tables = root.querySelectorAll("table");
+        tables.forEach((tbl) => {
+            tbl.querySelectorAll("tr").forEach((tr) => {
+                const cells = Array.from(tr.querySelectorAll("td, th")).map(text);
+                if (cells.length) rows.push(cells);
+            });
+        });
+        return rows;
+    };
+
+    const sections = {};
+    for (const id of sectionIds) {
+        const section = document.querySelector(`section#${id}`);
+        sections[id] = section ? tableRows(section) : null;
+    }
 
-    # ----- APPEND IF NOT DUPLICATE -----
-    sheet.append_row(row, value_input_option="USER_ENTERED")
-    print(f"Added: {stock_name} @ {trade_date_str}")
-    return True
+    const shp = document.querySelector("section#shareholding #quarterly-shp table.data-table");
+    const shareholding = shp
+        ? Array.from(shp.querySelectorAll("tbody tr")).map(
+              (tr) => Array.from(tr.querySelectorAll("td")).map(text))
+        : null;
 
-# ---------- MAIN SCRAPER FUNCTION (for use from other scripts) ----------
+    const ratiosDiv = document.querySelector("#top > div.company-info > div.company-ratios");
+    const topRatios = document.querySelector("#top-ratios");
 
-def results_page_scraper(page, stock_name=None, trade_date_str=None):
+    return {
+        sections: sections,
+        shareholding: shareholding,
+        company_ratios: ratiosDiv ? ratiosDiv.innerText : null,
+        top_ratios: topRatios ? Array.from(topRatios.querySelectorAll("li")).map(text) : null,
+    };
+}
+"""
+
+
+def extract_page_payload(page, section_ids=SECTION_IDS):
+    """
+    Serialize the `section_ids` tables (default: quarters / balance-sheet /
+    cash-flow / ratios), the quarterly shareholding table and the top ratios
+    block into one JSON payload with a single page.evaluate call:
+
+    {"sections": {"quarters": [[cell, ...], ...], ...},
+     "shareholding": [[cell, ...], ...],
+     "company_ratios": "...",
+     "top_ratios": ["Market Cap ₹ 1,234 Cr.", ...]}
     """
-    Accepts a Playwright `page` that is already on a Screener company URL.
-    Navigates to the Quarters tab, scrapes all metrics, logs (optionally) to
-    Google Sheets and returns a dict.
+    return page.evaluate(PAGE_PAYLOAD_JS, list(section_ids))
 
-    stock_name, trade_date_str are optional but required if you want to
-    append to Google Sheets.
+
+def parse_section_history(rows):
+    """
+    Every row of a section's period table against its header row:
+    {"periods": ["Sep 2023", ...], "rows": {"Sales": [float or None, ...], ...}}
     """
+    if not rows:
+        return None
+    periods = [c.strip() for c in rows[0][1:]]
+    table = {}
+    for cells in rows[1:]:
+        label = cells[0].replace("\u00a0", " ").rstrip("+ ").strip() if cells else ""
+        if not label or label in table:
+            continue
+        values = [clean_to_float(c, decimals=None) for c in cells[1:len(periods) + 1]]
+        table[label] = values + [None] * (len(periods) - len(values))
+    return {"periods": periods, "rows": table}
 
-    # Ensure we are on the #quarters tab of this company
-    base_url = page.url.split("#")[0].rstrip("/")
-    quarters_url = f"{base_url}/#quarters"
-    if page.url != quarters_url:
-        page.goto(quarters_url)
-        page.wait_for_load_state("networkidle")
 
-    # ---------- scrape ----------
-    quarterly = extract_quarterly_financials(page)
+def parse_history(sections):
+    """parse_section_history for each of HISTORY_SECTION_IDS present in `sections`."""
+    return {
+        section_id: parse_section_history(sections.get(section_id))
+        for section_id in HISTORY_SECTION_IDS
+        if sections.get(section_id)
+    }
+
+
+def parse_page_payload(payload, history=False):
+    """
+    Run the plain-list parsers over a page payload. median_pe is left as
+    None. With history=True the full tables go under result["history"].
+    """
+    sections = payload.get("sections") or {}
+    marketcap, stock_pe, industry_pe = parse_top_ratios(
+        payload.get("company_ratios"), payload.get("top_ratios")
+    )
+    return {
+        **parse_quarterly_financials(sections.get("quarters")),
+        "borrowings": parse_recent_borrowings(sections.get("balance-sheet")),
+        "cash_from_ops": parse_recent_cash_from_ops(sections.get("cash-flow")),
+        "working_capital_days": parse_recent_working_capital_days(sections.get("ratios")),
+        "marketcap": marketcap,
+        "stock_pe": stock_pe,
+        "industry_pe": industry_pe,
+        "median_pe": None,
+        "promoters_last2": parse_promoters_last2(payload.get("shareholding")),
+        **({"history": parse_history(sections)} if history else {}),
+    }
+
+
+# ---------- MAIN SCRAPER FUNCTION (for use from other scripts) ----------
+
+def _scrape_per_extractor(page):
+    """Original element-by-element scrape, one extractor at a time."""
+    with span("extract_quarterly_financials"):
+        quarterly = extract_quarterly_financials(page)
     print("Sales (last 5):", quarterly["sales"])
     print("Other Income (last 5):", quarterly["other_income"])
     print("OPM % (last 5):", quarterly["opm_percent"])
     print("Net Profit (last 5):", quarterly["net_profit"])
 
-    borrowings = extract_recent_borrowings(page)
+    with span("extract_recent_borrowings"):
+        borrowings = extract_recent_borrowings(page)
     print("Borrowings:", borrowings)
 
-    cash_from_ops = extract_recent_cash_from_ops(page)
+    with span("extract_recent_cash_from_ops"):
+        cash_from_ops = extract_recent_cash_from_ops(page)
     print("Cash from Ops:", cash_from_ops)
 
-    wc_days = extract_recent_working_capital_days(page)
+    with span("extract_recent_working_capital_days"):
+        wc_days = extract_recent_working_capital_days(page)
     print("Working Capital Days:", wc_days)
 
-    prom_last2 = extract_promoters_last2(page)
+    with span("extract_promoters_last2"):
+        prom_last2 = extract_promoters_last2(page)
     print("Promoters last 2:", prom_last2)
     # Top ratios (Market Cap, Stock PE, Industry PE)
-    page.evaluate("window.scrollTo(0, 0)")
-    time.sleep(1)
-    marketcap, stock_pe, industry_pe = extract_marketcap_stockpe_industrype(page)
+    with span("extract_marketcap_stockpe_industrype"):
+        page.evaluate("window.scrollTo(0, 0)")
+        wait_until(page, "top ratios", selector="#top-ratios", timeout=5000)
+        marketcap, stock_pe, industry_pe = extract_marketcap_stockpe_industrype(page)
     print("Market Cap:", marketcap)
     print("Stock PE:", stock_pe)
     print("Industry PE:", industry_pe)
 
-    # Fallback to Median PE if Industry PE missing
-    median_pe = None
-    if industry_pe is None:
-        median_pe = extract_median_pe(page)
-        print("Median PE (fallback):", median_pe)
-    else:
-        print("Median PE not needed, Industry PE present.")
-
-    
-
-    # ---------- build result dict using the actual variables we have ----------
-    result = {
+    return {
         **quarterly,                      # expands sales, other_income, opm_percent, net_profit
         "borrowings": borrowings,
         "cash_from_ops": cash_from_ops,
@@ -760,19 +962,58 @@ def results_page_scraper(page, stock_name=None, trade_date_str=None):
         "marketcap": marketcap,
         "stock_pe": stock_pe,
         "industry_pe": industry_pe,
-        "median_pe": median_pe,
+        "median_pe": None,
         "promoters_last2": prom_last2,
     }
-    # ---------- CLEAN STOCK NAME ----------
+
+
+def clean_stock_name(stock_name):
+    """Keep the part of a page title before the first " | "."""
     if stock_name:
         stock_name = stock_name.split(" | ")[0].strip()
-    # ---------- optionally write to Google Sheet ----------
+    return stock_name
+
+
+def company_code_from_url(url):
+    """'https://www.screener.in/company/531802/consolidated/#quarters' -> '531802'."""
+    match = re.search(r"/company/([^/#?]+)", url or "")
+    return match.group(1) if match else None
+
+
+def emit_decision(decision, result, stock_name, trade_date_str, company_code=None):
+    """
+    Hand a classified result to every active sink (Google Sheets, SQLite,
+    Parquet ...). The only side-effecting half of write_outputs.
+    """
+    if not decision.accepted:
+        print(f"Rejected {stock_name}: {decision.reason}")
+    row = decision_row(decision, stock_name, trade_date_str)
+    with span("sink_write"):
+        write_record(make_record(trade_date_str, company_code or stock_name, stock_name, result, row))
+
+
+def write_outputs(result, stock_name, trade_date_str, company_code=None):
+    """
+    Classify `result` and emit it to the output sinks. Returns True if the
+    stock passed the filters.
+    """
+    stock_name = clean_stock_name(stock_name)
+    with span("classification"):
+        decision = classify(result)
+    emit_decision(decision, result, stock_name, trade_date_str, company_code)
+    return decision.accepted
+
+
+def publish_result(result, stock_name=None, trade_date_str=None, company_code=None):
+    """
+    Shared tail of every scrape engine: clean the stock name, optionally
+    classify + write to the output sinks, print and return the result dict.
+    """
+    # ---------- CLEAN STOCK NAME ----------
+    stock_name = clean_stock_name(stock_name)
+    # ---------- optionally write to Google Sheet / local stores ----------
     if stock_name is not None and trade_date_str is not None:
-        classify_and_append_to_sheet(
-            result=result,
-            stock_name=stock_name,
-            trade_date_str=trade_date_str,
-        )
+        write_outputs(result, stock_name, trade_date_str, company_code)
 
     print("\n==== FINAL RESULT OBJECT ====")
     for k, v in result.items():
@@ -781,17 +1022,111 @@ def results_page_scraper(page, stock_name=None, trade_date_str=None):
     return result
 
 
+def goto_company(page, url, cache=None):
+    """
+    page.goto(url) and wait for networkidle. With a SnapshotCache, a fresh
+    cached copy of the document is served to the page through request
+    interception instead of the network, and a fetched one is stored.
+    """
+    if cache is None:
+        page.goto(url)
+        page.wait_for_load_state("networkidle")
+        return
+
+    doc_url = url.split("#")[0]
+    html = cache.get(doc_url)
+    if html is not None:
+        page.route(doc_url, lambda route: route.fulfill(
+            status=200, content_type="text/html; charset=utf-8", body=html))
+        try:
+            page.goto(url)
+            page.wait_for_load_state("networkidle")
+        finally:
+            page.unroute(doc_url)
+        return
+
+    response = page.goto(url)
+    page.wait_for_load_state("networkidle")
+    if response is not None and response.ok:
+        # Keyed by the document's own URL: after a redirect (renamed or
+        # merged company) it isn't the page of `doc_url`
+        cache.put(response.url, response.text())
+
+
+def results_page_scraper(page, stock_name=None, trade_date_str=None, bulk=True,
+                         url=None, cache=None, history=False):
+    """
+    Accepts a Playwright `page` that is already on a Screener company URL
+    (or opens `url` first). Navigates to the Quarters tab, scrapes all
+    metrics, logs (optionally) to Google Sheets and returns a dict.
+
+    stock_name, trade_date_str are optional but required if you want to
+    append to Google Sheets. With only trade_date_str, the stock is named
+    after the page title, as the click-through flow always did.
+
+    bulk=True reads every section with one page.evaluate call and parses the
+    plain lists in Python; bulk=False uses the per-cell extract_* helpers.
+
+    cache is an optional snapshot_cache.SnapshotCache consulted before the
+    company page is fetched from the network.
+
+    history=True also captures every column of the quarters, profit & loss,
+    balance sheet, cash flow and ratios tables under result["history"].
+    """
+
+    # Ensure we are on the #quarters tab of this company
+    base_url = (url or page.url).split("#")[0].rstrip("/")
+    quarters_url = f"{base_url}/#quarters"
+    if page.url != quarters_url:
+        with span("navigation", url=quarters_url):
+            goto_company(page, quarters_url, cache)
+
+    # ---------- scrape ----------
+    if bulk:
+        with span("bulk_payload"):
+            page.wait_for_selector("section#quarters", timeout=10000)
+            section_ids = HISTORY_SECTION_IDS if history else SECTION_IDS
+            result = parse_page_payload(extract_page_payload(page, section_ids), history)
+    else:
+        result = _scrape_per_extractor(page)
+        if history:
+            with span("history_payload"):
+                sections = extract_page_payload(page, HISTORY_SECTION_IDS)["sections"]
+            result["history"] = parse_history(sections)
+
+    # Fallback to Median PE if Industry PE missing
+    if result["industry_pe"] is None:
+        with span("fetch_median_pe"):
+            result["median_pe"] = fetch_median_pe(page)
+        if result["median_pe"] is None:
+            with span("extract_median_pe"):
+                # Chart assets were blocked while this page loaded; reload it with them
+                reload = charts_blocked(page)
+                with charts_allowed(page):
+                    if reload:
+                        page.reload()
+                        page.wait_for_load_state("networkidle")
+                    result["median_pe"] = extract_median_pe(page)
+        print("Median PE (fallback):", result["median_pe"])
+    else:
+        print("Median PE not needed, Industry PE present.")
+
+    if stock_name is None and trade_date_str is not None:
+        stock_name = page.title()
+    return publish_result(result, stock_name, trade_date_str, company_code_from_url(page.url))
+
+
 # ---------- Standalone debug harness ----------
 
 if __name__ == "__main__":
     # Quick manual test on a single company
-    with sync_playwright() as p:
-        user_data_dir = os.path.join(os.getcwd(), "user_data")
-        browser = p.chromium.launch_persistent_context(user_data_dir, headless=True)
-        page = browser.new_page()
-        page.goto("https://www.screener.in/company/531802/#quarters")
-        page.wait_for_load_state("networkidle")
+    from playwright.sync_api import sync_playwright
 
-        results_page_scraper(page)
+    from browser_session import BrowserSession
 
-        browser.close()
\ No newline at end of file
+    with sync_playwright() as p, BrowserSession(p, headless=True) as session:
+        with session.page() as page:
+            results_page_scraper(page, url="https://www.screener.in/company/531802/")
+    close_sinks()
+    WAIT_STATS.report()
+    METRICS.report()
\ No newline at end of file
@@ -0,0 +1,41 @@
+import json
+import os
+
+# Declarative, versioned screening rule sets. classify() (results_scraper)
+# and classify_arrays() (batch_classifier) read their thresholds from one of
+# these instead of hardcoding them, so a new version can be replayed over the
+# stored raw results (see rescreen.py) without scraping again.
+#
+# A rule set is a plain dict; extra versions can live in JSON files with the
+# same keys:
+#
+#   {"version": "v2", "min_marketcap": 150, "sales_growth_pct": 12, ...}
+
+RULESETS = {
+    "v1": {
+        "version": "v1",
+        "min_marketcap": 125,          # Cr; smaller companies are rejected
+        "sales_growth_pct": 10.0,      # "good sales": above each of the last 4 quarters by this
+        "profit_growth_pct": 15.0,     # "good profit": core profit (NP - OI) vs previous quarter
+        "fair_pe_band": 3.0,           # |stock PE - industry/median PE| within this is fair
+    },
+}
+DEFAULT_VERSION = "v1"
+DEFAULT_RULES = RULESETS[DEFAULT_VERSION]
+
+
+def load_ruleset(name_or_path=None):
+    """A rule set by version name ("v1") or from a JSON file; None -> default."""
+    if name_or_path is None:
+        return DEFAULT_RULES
+    if name_or_path in RULESETS:
+        return RULESETS[name_or_path]
+    if not os.path.exists(name_or_path):
+        raise ValueError(f"Unknown rule set {name_or_path!r} (known: {', '.join(RULESETS)})")
+    with open(name_or_path) as f:
+        rules = json.load(f)
+    missing = set(DEFAULT_RULES) - set(rules) - {"version"}
+    if missing:
+        raise ValueError(f"Rule set {name_or_path} is missing {', '.join(sorted(missing))}")
+    rules.setdefault("version", os.path.splitext(os.path.basename(name_or_path))[0])
+    return rules
@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+
+from worker_pool import _STOP, RateLimiter, _writer
+
+# Process-pool sharding: the harvested company list is split across N
+# processes (one per core by default). Each process owns its own browser,
+# launched on a private copy of the user_data profile (Chromium locks a
+# profile to one process), or an HTTP engine session. Shards only scrape;
+# their result dicts come back over a multiprocessing queue to the parent,
+# unchanged, and the parent is the single writer to the output sinks and the
+# run ledger.
+#
+# Every shard keeps min_interval * shards between its requests, so all
+# shards together stay at about one request per min_interval to the host.
+#
+# A shard's profile copy is made again whenever the source profile's login
+# state (cookie store, Local State) is newer than the copy, so re-logging in
+# to user_data reaches the shards on their next run.
+
+SHARD_ROOT = ".shards"
+PROFILE_IGNORE = shutil.ignore_patterns(
+    "Singleton*", "*.lock", "lockfile", "Cache", "Code Cache", "GPUCache",
+    "ShaderCache", "GrShaderCache", "Crashpad",
+)
+# Files that change when the profile logs in (or its session is refreshed)
+PROFILE_STATE_FILES = (
+    "Local State",
+    os.path.join("Default", "Cookies"),
+    os.path.join("Default", "Network", "Cookies"),
+)
+COPY_STAMP = ".copied"
+
+
+def profile_mtime(profile_dir):
+    """Newest modification time of the profile's login state files (0 if none)."""
+    times = [os.path.getmtime(os.path.join(profile_dir, name))
+             for name in PROFILE_STATE_FILES
+             if os.path.exists(os.path.join(profile_dir, name))]
+    return max(times, default=0)
+
+
+def copy_profile(src, dst, refresh=False):
+    """
+    Copy the Chromium profile `src` to `dst` (skipping locks and caches).
+    An existing copy is kept unless `refresh` or `src` changed since it was made.
+    """
+    stamp = os.path.join(dst, COPY_STAMP)
+    if os.path.isdir(dst):
+        if (not refresh and os.path.exists(stamp)
+                and os.path.getmtime(stamp) >= profile_mtime(src)):
+            return dst
+        shutil.rmtree(dst)
+    shutil.copytree(src, dst, ignore=PROFILE_IGNORE)
+    open(stamp, "w").close()
+    return dst
+
+
+def _shard_main(shard_id, jobs, results, profile_dir, engine, headless, min_interval,
+                cache_dir, block, history=False, cache_ttl=None):
+    """
+    Scrape `jobs` in this process and put (job, result, error) on `results`,
+    with the job's "name" replaced by the company page title.
+    """
+    from snapshot_cache import SnapshotCache
+
+    cache = None
+    if cache_dir:
+        cache = SnapshotCache(cache_dir, ttl=cache_ttl) if cache_ttl else SnapshotCache(cache_dir)
+    limiter = RateLimiter(min_interval)
+
+    def scrape_all(scrape):
+        for job in jobs:
+            try:
+                limiter.wait(job["url"])
+                result, title = scrape(job["url"])
+                results.put((dict(job, name=title or job["name"]), result, None))
+            except Exception as e:
+                print(f"[shard {shard_id}] ⚠ failed {job['url']}: {e}")
+                results.put((job, None, repr(e)))
+
+    try:
+        if engine == "http":
+            from http_engine import (
+                fetch_company_html,
+                load_profile_cookies,
+                make_session,
+                page_title,
+                result_from_html,
+            )
+
+            # The cached cookies are re-read once the profile copy is newer
+            cookies_file = os.path.join(profile_dir, "cookies.json")
+            stale = (not os.path.exists(cookies_file)
+                     or os.path.getmtime(cookies_file) < profile_mtime(profile_dir))
+            cookies = load_profile_cookies(profile_dir, cookies_file=cookies_file, refresh=stale)
+            session = make_session(cookies=cookies)
+
+            def scrape(url):
+                html_text = fetch_company_html(session, url, cache=cache)
+                return result_from_html(session, url, html_text, history), page_title(html_text)
+
+            scrape_all(scrape)
+        else:
+            from playwright.sync_api import sync_playwright
+
+            from browser_session import BrowserSession
+            from resource_policy import install_block_policy
+            from results_scraper import results_page_scraper
+
+            with sync_playwright() as p, BrowserSession(
+                p,
+                user_data_dir=profile_dir,
+                headless=headless,
+                setup_context=install_block_policy if block else None,
+            ) as session:
+                def scrape(url):
+                    with session.page() as page:
+                        result = results_page_scraper(page, url=url, cache=cache,
+                                                      history=history)
+                        return result, page.title()
+
+                scrape_all(scrape)
+    finally:
+        results.put(("done", shard_id, None))
+
+
+def scrape_sharded(jobs, shards=None, engine="browser", profile_dir="user_data",
+                   shard_root=SHARD_ROOT, refresh_profiles=False, headless=True,
+                   min_interval=1.0, cache_dir=None, block=True, ledger=None, history=False,
+                   cache_ttl=None):
+    """
+    Scrape `jobs` (dicts with "url", "name", "trade_date") across `shards`
+    processes (default: one per CPU) with engine "browser" or "http".
+    Profile copies are refreshed when `profile_dir` has logged in since they
+    were made (or always with refresh_profiles). `cache_ttl` is the snapshot
+    cache TTL in seconds. Results are written by this process only. Returns
+    (accepted_jobs, [(job, error), ...]) like worker_pool.scrape_with_pool.
+    """
+    if ledger is not None:
+        jobs = ledger.pending(jobs)
+    if not jobs:
+        return [], []
+    shards = max(1, min(shards or os.cpu_count() or 1, len(jobs)))
+    parts = [jobs[i::shards] for i in range(shards)]
+
+    ctx = multiprocessing.get_context("spawn")   # Playwright isn't fork-safe
+    results = ctx.Queue()
+    processes = []
+    for i, part in enumerate(parts):
+        shard_profile = copy_profile(
+            profile_dir, os.path.join(shard_root, f"profile-{i}"), refresh=refresh_profiles
+        )
+        proc = ctx.Process(
+            target=_shard_main,
+            args=(i, part, results, shard_profile, engine, headless, min_interval * shards,
+                  cache_dir, block, history, cache_ttl),
+        )
+        proc.start()
+        processes.append(proc)
+    print(f"Started {shards} shards for {len(jobs)} companies ({engine} engine).")
+
+    # Forward shard results to the same single writer thread the worker pool uses
+    to_writer = queue.Queue()
+    accepted, errors = [], []
+    writer = threading.Thread(target=_writer, args=(to_writer, accepted, errors, ledger))
+    writer.start()
+
+    running = len(processes)
+    while running:
+        try:
+            item = results.get(timeout=5)
+        except queue.Empty:
+            if not any(proc.is_alive() for proc in processes):
+                print("⚠ shard processes exited without reporting back")
+                break
+            continue
+        if item[0] == "done":
+            running -= 1
+            continue
+        to_writer.put(item)
+    to_writer.put(_STOP)
+    writer.join()
+    for proc in processes:
+        proc.join()
+
+    print(f"Shards done: {len(accepted)} accepted, {len(errors)} errors, {len(jobs)} jobs.")
+    return accepted, errors
@@ -0,0 +1,159 @@
+import atexit
+import threading
+import time
+
+# Batched, deduplicated writer for the results sheet. The existing
+# (Date, Stock Name) keys are read once into a set, accepted rows are
+# buffered and written with a single append_rows call per batch, instead of
+# get_all_values() + append_row() for every stock.
+
+# ====== GOOGLE SHEETS CONFIG ======
+SERVICE_ACCOUNT_FILE = "keys.json"        # path to your service account JSON
+SHEET_ID = "1GrNsCpFHJ2XtSHw_DgI-_PORGKhBi1tkTSQyALJnKoQ"           # <<< put your sheet ID here
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+# Header row of the results sheet, in the order classify_result builds rows
+SHEET_COLUMNS = [
+    "Date",
+    "Stock Name",
+    "Market Cap (Cr)",
+    "Stock PE",
+    "Industry/Median PE",
+    "Result Type",
+    "Valuation",
+    "Sales vs last 4",
+    "Profit (NP-OI) vs last 4",
+    "OPM comment",
+    "Borrowings trend",
+    "WC days trend",
+    "CFO trend",
+    "Remarks",
+]
+# ==================================
+
+
+def _row_key(date_str, stock_name):
+    return (str(date_str).strip(), str(stock_name).strip().lower())
+
+
+class SheetWriter:
+    """
+    Wraps anything with gspread's Worksheet get_all_values()/append_rows()
+    (a real worksheet or a local fake). Buffered rows are flushed when
+    `batch_size` rows are pending, when the oldest pending row is older than
+    `flush_interval` seconds and on flush()/close() (the shared default
+    writer is also flushed at interpreter exit).
+    """
+
+    def __init__(self, sheet, batch_size=50, flush_interval=30.0):
+        self.sheet = sheet
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._keys = None
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def _load_keys(self):
+        keys = set()
+        for r in self.sheet.get_all_values():
+            if len(r) >= 2:
+                keys.add(_row_key(r[0], r[1]))
+        return keys
+
+    def append(self, row):
+        """
+        Queue `row` ([Date, Stock Name, ...]) unless its (Date, Stock Name)
+        key is already in the sheet or pending. Returns True if accepted.
+        """
+        key = _row_key(row[0], row[1])
+        with self._lock:
+            if self._keys is None:
+                self._keys = self._load_keys()
+            if key in self._keys:
+                print(f"Duplicate found for {row[1]} on {row[0]} — skipping.")
+                return False
+            self._keys.add(key)
+            self._buffer.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = (
+                len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._oldest >= self.flush_interval
+            )
+        print(f"Queued: {row[1]} @ {row[0]}")
+        if due:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write all pending rows with one append_rows call."""
+        with self._lock:
+            if not self._buffer:
+                return 0
+            rows = self._buffer
+            # Rows stay buffered if the API call fails
+            self.sheet.append_rows(rows, value_input_option="USER_ENTERED")
+            self._buffer, self._oldest = [], None
+        print(f"Added {len(rows)} rows to sheet.")
+        return len(rows)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------- Shared default writer (lazy auth) ----------
+
+_default_writer = None
+_default_lock = threading.Lock()
+
+
+def open_sheet(service_account_file=SERVICE_ACCOUNT_FILE, sheet_id=SHEET_ID):
+    """Authorize gspread with the service account and open the results worksheet."""
+    from google.oauth2.service_account import Credentials
+    import gspread
+
+    creds = Credentials.from_service_account_file(service_account_file, scopes=SCOPES)
+    return gspread.authorize(creds).open_by_key(sheet_id).sheet1
+
+
+def get_default_writer():
+    """
+    The process-wide writer used by classify_and_append_to_sheet. Sheets is
+    only authorized on the first write, so importing the scraper, dry runs
+    and workers that never write pay nothing and need no credentials.
+    """
+    global _default_writer
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = SheetWriter(open_sheet())
+            # Last resort for runs that end without close_sinks()
+            atexit.register(flush_default_writer)
+        return _default_writer
+
+
+def set_default_writer(writer):
+    """
+    Replace the shared writer, e.g. with a SheetWriter over a fake worksheet
+    or any object with append(row) -> bool and flush().
+    """
+    global _default_writer
+    with _default_lock:
+        _default_writer = writer
+
+
+def flush_default_writer():
+    """Flush the shared writer if one was ever created."""
+    with _default_lock:
+        writer = _default_writer
+    return writer.flush() if writer is not None else 0
@@ -0,0 +1,375 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+from sheet_writer import SHEET_COLUMNS, flush_default_writer, get_default_writer
+
+# Output sinks for scraped companies. Every sink receives the same record:
+#
+#   {"trade_date": "14 November", "trade_day": "2025-11-14",
+#    "company_code": "531802", "stock_name": "ABC Ltd",
+#    "result": {...raw result dict...},
+#    "classification": {SHEET_COLUMNS -> value} or None if filtered out,
+#    "scraped_at": "2025-11-14T18:03:11"}
+#
+# trade_date is the results day as the site shows it (no year) and is what
+# the sheet's Date column gets; trade_day is the same day as an ISO date.
+# Google Sheets is one sink among others; the local ones keep the full raw
+# result keyed by (trade_day, company_code) for backtests. When the scrape
+# ran with history, result["history"] holds every period of the company's
+# tables ({section: {"periods": [...], "rows": {label: [values]}}}).
+
+
+# ---------- Record keys ----------
+
+def trade_day(text, today=None):
+    """
+    The date of a results-day label ('14 November'): the latest such day not
+    after `today` (default: today), so '29 February' finds the last leap
+    year. ISO dates pass through. None if `text` isn't a day.
+    """
+    text = (text or "").strip()
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        pass
+    today = today or date.today()
+    for year in range(today.year, today.year - 5, -1):
+        try:
+            day = datetime.strptime(f"{text} {year}", "%d %B %Y").date()
+        except ValueError:
+            continue
+        if day <= today:
+            return day
+    return None
+
+
+def trade_day_key(text, today=None):
+    """trade_day as an ISO string, or `text` itself when it isn't a day label."""
+    day = trade_day(text, today)
+    return day.isoformat() if day else (text or "").strip()
+
+
+def make_record(trade_date, company_code, stock_name, result, row):
+    return {
+        "trade_date": trade_date,
+        "trade_day": trade_day_key(trade_date),
+        "company_code": company_code,
+        "stock_name": stock_name,
+        "result": result,
+        "classification": dict(zip(SHEET_COLUMNS, row)) if row is not None else None,
+        "scraped_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+class SinkError(Exception):
+    """One or more sinks failed to store a record."""
+
+
+class Sink:
+    """Base sink: write(record), flush(), close()."""
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+# ---------- Google Sheets ----------
+
+class SheetsSink(Sink):
+    """Append accepted stocks to the results sheet through a SheetWriter."""
+
+    def __init__(self, writer=None):
+        self.writer = writer   # None -> shared, lazily authorized default writer
+
+    def write(self, record):
+        if record["classification"] is None:
+            return False
+        row = [record["classification"][c] for c in SHEET_COLUMNS]
+        return (self.writer or get_default_writer()).append(row)
+
+    def flush(self):
+        if self.writer is not None:
+            return self.writer.flush()
+        return flush_default_writer()
+
+
+# ---------- SQLite ----------
+
+class SQLiteSink(Sink):
+    """
+    Upsert one row per (trade_day, company_code) into a local SQLite file.
+    A result's history goes to the long `history` table, one row per value.
+    Files written before trade_day existed are migrated on open.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS results (
+        trade_day      TEXT NOT NULL,
+        trade_date     TEXT,
+        company_code   TEXT NOT NULL,
+        stock_name     TEXT,
+        accepted       INTEGER NOT NULL,
+        result_type    TEXT,
+        valuation      TEXT,
+        classification TEXT,
+        result         TEXT NOT NULL,
+        scraped_at     TEXT NOT NULL,
+        PRIMARY KEY (trade_day, company_code)
+    )
+    """
+    HISTORY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS history (
+        trade_day      TEXT NOT NULL,
+        company_code   TEXT NOT NULL,
+        section        TEXT NOT NULL,
+        label          TEXT NOT NULL,
+        period_index   INTEGER NOT NULL,
+        period         TEXT NOT NULL,
+        value          REAL,
+        PRIMARY KEY (trade_day, company_code, section, label, period_index)
+    )
+    """
+
+    def __init__(self, path="results.sqlite", batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._migrate()
+        self._conn.execute(self.SCHEMA)
+        self._conn.execute(self.HISTORY_SCHEMA)
+        self._conn.commit()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _migrate(self):
+        """Re-key tables keyed by the year-less trade_date on the ISO trade_day."""
+        columns = [r[1] for r in self._conn.execute("PRAGMA table_info(results)")]
+        if not columns or "trade_day" in columns:
+            return
+        conn = self._conn
+        conn.execute("ALTER TABLE results RENAME TO results_old")
+        has_history = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history'"
+        ).fetchone()
+        if has_history:
+            conn.execute("ALTER TABLE history RENAME TO history_old")
+        conn.execute(self.SCHEMA)
+        conn.execute(self.HISTORY_SCHEMA)
+
+        # The year of an old row is the one before or at its scrape date
+        days = {}
+        for row in conn.execute("SELECT * FROM results_old").fetchall():
+            trade_date, code, scraped_at = row[0], row[1], row[8]
+            day = trade_day_key(trade_date, datetime.fromisoformat(scraped_at).date())
+            days[(trade_date, code)] = day
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (day,) + tuple(row))
+        if has_history:
+            for row in conn.execute("SELECT * FROM history_old").fetchall():
+                day = days.get((row[0], row[1])) or trade_day_key(row[0])
+                conn.execute("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (day,) + tuple(row[1:]))
+            conn.execute("DROP TABLE history_old")
+        conn.execute("DROP TABLE results_old")
+        conn.commit()
+        print(f"SQLiteSink: re-keyed {len(days)} stored results on trade_day in {self.path}")
+
+    def _history_rows(self, record, history):
+        for section, table in history.items():
+            if not table:
+                continue
+            for label, values in table["rows"].items():
+                for i, (period, value) in enumerate(zip(table["periods"], values)):
+                    yield (record["trade_day"], record["company_code"], section, label,
+                           i, period, value)
+
+    def write(self, record):
+        cls = record["classification"]
+        result = dict(record["result"])
+        history = result.pop("history", None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record["trade_day"],
+                    record["trade_date"],
+                    record["company_code"],
+                    record["stock_name"],
+                    int(cls is not None),
+                    cls["Result Type"] if cls else None,
+                    cls["Valuation"] if cls else None,
+                    json.dumps(cls) if cls else None,
+                    json.dumps(result),
+                    record["scraped_at"],
+                ),
+            )
+            if history:
+                key = (record["trade_day"], record["company_code"])
+                self._conn.execute(
+                    "DELETE FROM history WHERE trade_day = ? AND company_code = ?", key
+                )
+                self._conn.executemany(
+                    "INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._history_rows(record, history),
+                )
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._conn.commit()
+                self._pending = 0
+        return True
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+# ---------- Parquet ----------
+
+class ParquetSink(Sink):
+    """
+    Buffer records and write them as Parquet part files under `root`, one
+    column per result metric (series as list<double>) plus the history, if
+    any, as a JSON string. Needs pyarrow.
+    """
+
+    SERIES = ["sales", "other_income", "net_profit", "borrowings", "cash_from_ops",
+              "working_capital_days", "promoters_last2"]
+    SCALARS = ["marketcap", "stock_pe", "industry_pe", "median_pe"]
+
+    def __init__(self, root="results_parquet", batch_size=500):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("ParquetSink needs pyarrow (pip install pyarrow)") from e
+        self._pa, self._pq = pa, pq
+        self.root = root
+        self.batch_size = batch_size
+        self._buffer = []
+        self._parts = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+        self.schema = pa.schema(
+            [
+                ("trade_day", pa.string()),
+                ("trade_date", pa.string()),
+                ("company_code", pa.string()),
+                ("stock_name", pa.string()),
+                ("accepted", pa.bool_()),
+                ("result_type", pa.string()),
+                ("valuation", pa.string()),
+                ("classification", pa.string()),
+                ("scraped_at", pa.string()),
+                ("opm_percent", pa.list_(pa.string())),
+                ("history", pa.string()),
+            ]
+            + [(name, pa.list_(pa.float64())) for name in self.SERIES]
+            + [(name, pa.float64()) for name in self.SCALARS]
+        )
+
+    def write(self, record):
+        result = record["result"]
+        cls = record["classification"]
+        row = {
+            "trade_day": record["trade_day"],
+            "trade_date": record["trade_date"],
+            "company_code": record["company_code"],
+            "stock_name": record["stock_name"],
+            "accepted": cls is not None,
+            "result_type": cls["Result Type"] if cls else None,
+            "valuation": cls["Valuation"] if cls else None,
+            "classification": json.dumps(cls) if cls else None,
+            "scraped_at": record["scraped_at"],
+            "opm_percent": result.get("opm_percent"),
+            "history": json.dumps(result["history"]) if result.get("history") else None,
+        }
+        for name in self.SERIES + self.SCALARS:
+            row[name] = result.get(name)
+        with self._lock:
+            self._buffer.append(row)
+            due = len(self._buffer) >= self.batch_size
+        if due:
+            self.flush()
+        return True
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return 0
+            rows, self._buffer = self._buffer, []
+            self._parts += 1
+            name = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._parts}.parquet"
+            table = self._pa.Table.from_pylist(rows, schema=self.schema)
+            self._pq.write_table(table, os.path.join(self.root, name))
+        return len(rows)
+
+
+# ---------- Active sinks ----------
+
+_sinks = [SheetsSink()]
+_sinks_lock = threading.Lock()
+
+
+def get_sinks():
+    with _sinks_lock:
+        return list(_sinks)
+
+
+def set_sinks(sinks):
+    """Replace the active sinks (an empty list runs without any output)."""
+    global _sinks
+    with _sinks_lock:
+        _sinks = list(sinks)
+
+
+def add_sink(sink):
+    with _sinks_lock:
+        _sinks.append(sink)
+
+
+def write_record(record):
+    """
+    Write `record` to every active sink; one failing sink doesn't stop the
+    others. Raises SinkError afterwards if any of them failed.
+    """
+    failed = []
+    for sink in get_sinks():
+        try:
+            sink.write(record)
+        except Exception as e:
+            print(f"⚠ {type(sink).__name__} failed for {record['stock_name']}: {e}")
+            failed.append(f"{type(sink).__name__}: {e}")
+    if failed:
+        raise SinkError("; ".join(failed))
+
+
+def flush_sinks():
+    """Flush every active sink. Returns True only if all of them flushed."""
+    ok = True
+    for sink in get_sinks():
+        try:
+            sink.flush()
+        except Exception as e:
+            print(f"⚠ {type(sink).__name__} failed to flush: {e}")
+            ok = False
+    return ok
+
+
+def close_sinks():
+    for sink in get_sinks():
+        sink.close()
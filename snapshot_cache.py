@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# On-disk snapshot cache of company page HTML. Blobs are content-addressed
+# (sha256 of the HTML, gzipped under objects/), and a small SQLite index maps
+# each URL to its blob with fetch/access times for TTL and LRU eviction
+# under a total size cap.
+
+DEFAULT_ROOT = ".snapshot_cache"
+
+
+def normalize_url(url):
+    """Cache key: drop the #fragment and any trailing slash."""
+    return url.split("#")[0].rstrip("/")
+
+
+class SnapshotCache:
+    def __init__(self, root=DEFAULT_ROOT, ttl=6 * 3600, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(root, "index.sqlite"), check_same_thread=False, timeout=30
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                url         TEXT PRIMARY KEY,
+                digest      TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                fetched_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:] + ".html.gz")
+
+    def _delete(self, url):
+        row = self._conn.execute("SELECT digest FROM entries WHERE url = ?", (url,)).fetchone()
+        self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+        if row is None:
+            return
+        still_used = self._conn.execute(
+            "SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (row[0],)
+        ).fetchone()
+        if not still_used:
+            try:
+                os.remove(self._blob_path(row[0]))
+            except FileNotFoundError:
+                pass
+
+    def get(self, url):
+        """Cached HTML for `url`, or None if missing or older than the TTL."""
+        key = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, fetched_at FROM entries WHERE url = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is not None and now - row[1] > self.ttl:
+                self._delete(key)
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                with gzip.open(self._blob_path(row[0]), "rt", encoding="utf-8") as f:
+                    html = f.read()
+            except FileNotFoundError:
+                self._delete(key)
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return html
+
+    def put(self, url, html):
+        """Store `html` for `url` and evict expired / least recently used entries."""
+        key = normalize_url(url)
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            now = time.time()
+            old = self._conn.execute("SELECT digest FROM entries WHERE url = ?", (key,)).fetchone()
+            if old is not None and old[0] != digest:
+                self._delete(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, digest, os.path.getsize(path), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        for (url,) in self._conn.execute(
+            "SELECT url FROM entries WHERE fetched_at < ?", (now - self.ttl,)
+        ).fetchall():
+            self._delete(url)
+
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute(
+            "SELECT url, size FROM entries ORDER BY accessed_at"
+        ).fetchall():
+            self._delete(url)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,61 @@
+import pytest
+
+
+class FakeWorksheet:
+    """
+    Local stand-in for a gspread Worksheet: the two calls SheetWriter makes,
+    recorded so tests can check how often the "API" was hit.
+    """
+
+    def __init__(self, rows=None, fail_appends=0):
+        self.rows = [list(r) for r in rows or []]
+        self.fail_appends = fail_appends   # the next N append_rows calls raise
+        self.get_all_values_calls = 0
+        self.append_calls = []
+
+    def get_all_values(self):
+        self.get_all_values_calls += 1
+        return [list(r) for r in self.rows]
+
+    def append_rows(self, rows, value_input_option=None):
+        if self.fail_appends:
+            self.fail_appends -= 1
+            raise RuntimeError("quota exceeded")
+        self.append_calls.append([list(r) for r in rows])
+        self.rows.extend(list(r) for r in rows)
+
+
+@pytest.fixture
+def worksheet():
+    return FakeWorksheet([["Date", "Stock Name"], ["14 November", "ABC Ltd"]])
+
+
+def _maybe(rng, value, missing=0.1):
+    return None if rng.random() < missing else value
+
+
+def _random_result(rng):
+    def series(n, lo, hi):
+        return [_maybe(rng, round(rng.uniform(lo, hi), 2)) for _ in range(n)]
+
+    industry_pe = _maybe(rng, round(rng.uniform(5, 60), 2), missing=0.3)
+    return {
+        "sales": series(rng.randint(0, 5), 50, 500),
+        "other_income": series(5, 0, 20),
+        "net_profit": series(5, -20, 80),
+        "opm_percent": [_maybe(rng, f"{rng.randint(-5, 40)}%") for _ in range(rng.randint(0, 5))],
+        "borrowings": series(2, 0, 400),
+        "cash_from_ops": series(2, -50, 150),
+        "working_capital_days": series(2, 0, 120),
+        "promoters_last2": [_maybe(rng, rng.choice([0.0, 45.5, 60.0, 72.25])) for _ in range(2)],
+        "marketcap": _maybe(rng, round(rng.uniform(50, 5000), 2)),
+        "stock_pe": _maybe(rng, round(rng.uniform(5, 60), 2)),
+        "industry_pe": industry_pe,
+        "median_pe": None if industry_pe is not None else _maybe(rng, round(rng.uniform(5, 60), 2)),
+    }
+
+
+@pytest.fixture
+def random_result():
+    """random_result(rng) -> a result dict with random figures and gaps."""
+    return _random_result
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("lxml")
+
+from backfill import RESULTS_URL, _link_date, previous_result_day  # noqa: E402
+
+
+class FakeResultsPage:
+    """Serves month and day links of /results/latest/ by URL."""
+
+    def __init__(self, links):
+        self.links = links
+        self.url = None
+
+    def goto(self, url):
+        self.url = url
+
+    def wait_for_selector(self, selector, timeout=None):
+        pass
+
+    def evaluate(self, js, xpath):
+        return self.links.get(self.url, [])
+
+
+def test_link_date_finds_the_last_leap_year():
+    assert _link_date("29 February", date(2026, 3, 1)) == date(2024, 2, 29)
+    assert _link_date("14 November", date(2026, 1, 10)) == date(2025, 11, 14)
+
+
+def test_previous_result_day_crosses_into_the_previous_month():
+    first = date.today().replace(day=1)
+    last_month = first - timedelta(days=1)
+    this_name, last_name = first.strftime("%B"), last_month.strftime("%B")
+    page = FakeResultsPage({
+        RESULTS_URL: [{"text": last_name, "url": "m1"}, {"text": this_name, "url": "m2"}],
+        "m1": [{"text": f"27 {last_name}", "url": "d27"}, {"text": f"28 {last_name}", "url": "d28"}],
+        "m2": [{"text": f"1 {this_name}", "url": "d1"}],
+    })
+    day, text, url = previous_result_day(page, first)
+    assert (day, text, url) == (last_month.replace(day=28), f"28 {last_name}", "d28")
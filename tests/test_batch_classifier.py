@@ -0,0 +1,22 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch_classifier import classify_batch  # noqa: E402
+from results_scraper import classify_result  # noqa: E402
+
+
+def test_classify_batch_matches_classify_result(random_result):
+    rng = random.Random(20251114)
+    results = [random_result(rng) for _ in range(2000)]
+    names = [f"Stock {i}" for i in range(len(results))]
+
+    batch_rows = classify_batch(results, names, "14 November")
+
+    for result, name, batch_row in zip(results, names, batch_rows):
+        assert batch_row == classify_result(result, name, "14 November"), result
+    assert any(r is not None for r in batch_rows)
+    assert any(r is None for r in batch_rows)
+
@@ -0,0 +1,50 @@
+import pickle
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch_classifier import classify_batch  # noqa: E402
+from company_result import CompanyResult  # noqa: E402
+from results_scraper import classify_result  # noqa: E402
+
+
+def test_company_results_classify_like_their_dicts(random_result):
+    rng = random.Random(24)
+    results = [random_result(rng) for _ in range(500)]
+    packed = [CompanyResult.from_dict(r) for r in results]
+    names = [f"Stock {i}" for i in range(len(results))]
+
+    assert classify_batch(packed, names, "14 November") == classify_batch(results, names, "14 November")
+    for result, record, name in zip(results, packed, names):
+        assert classify_result(record, name, "14 November") == classify_result(result, name, "14 November")
+        assert CompanyResult.from_bytes(record.to_bytes()) == record
+        assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_opm_is_kept_as_a_number():
+    record = CompanyResult.from_dict({"opm_percent": ["12.5%", "-", 14, None, "1,020%"]})
+    assert record.opm_percent == [12.5, None, 14.0, None, 1020.0]
+    assert record.to_dict()["opm_percent"] == ["12.5%", None, "14%", None, "1020%"]
+
+
+def test_rescreen_loads_the_store_as_company_results(tmp_path, random_result):
+    import sinks
+    from rescreen import load_store, rescreen
+    from rules import DEFAULT_RULES
+
+    path = str(tmp_path / "results.sqlite")
+    sink = sinks.SQLiteSink(path)
+    rng = random.Random(8)
+    results = [random_result(rng) for _ in range(50)]
+    for i, result in enumerate(results):
+        row = classify_result(result, f"Stock {i}", "14 November")
+        sink.write(sinks.make_record("14 November", str(i), f"Stock {i}", result, row))
+    sink.close()
+
+    records = load_store(path, ["14 November"])
+    assert len(records) == 50
+    assert all(isinstance(r["result"], CompanyResult) for r in records)
+    _, changes = rescreen(records, DEFAULT_RULES)
+    assert changes == []
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("lxml")
+
+from http_engine import payload_from_html  # noqa: E402
+from results_scraper import parse_history  # noqa: E402
+
+PROFIT_LOSS = """
+<html><body><section id="profit-loss">
+<table class="data-table responsive-text-nowrap">
+  <thead><tr><th></th><th>Mar 2024</th><th>Mar 2025</th><th>TTM</th></tr></thead>
+  <tbody>
+    <tr><td>Sales&nbsp;+</td><td>1,000</td><td>1,200</td><td>1,250</td></tr>
+    <tr><td>OPM %</td><td>12%</td><td>14%</td></tr>
+  </tbody>
+</table>
+<table class="ranges-table">
+  <tr><th colspan="2">Compounded Sales Growth</th></tr>
+  <tr><td>10 Years:</td><td>12%</td></tr>
+  <tr><td>TTM:</td><td>9%</td></tr>
+</table>
+</section></body></html>
+"""
+
+
+def test_history_reads_only_the_period_table():
+    history = parse_history(payload_from_html(PROFIT_LOSS)["sections"])
+    assert history == {
+        "profit-loss": {
+            "periods": ["Mar 2024", "Mar 2025", "TTM"],
+            "rows": {"Sales": [1000.0, 1200.0, 1250.0], "OPM %": [12.0, 14.0, None]},
+        }
+    }
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+pytest.importorskip("lxml")
+pytest.importorskip("requests")
+
+from http_engine import http_page_scraper, make_session, payload_from_html  # noqa: E402
+from replay import Fixtures, FixtureServer  # noqa: E402
+from results_scraper import HISTORY_SECTION_IDS, extract_page_payload, parse_page_payload  # noqa: E402
+
+COMPANY_URL = "https://www.screener.in/company/531802/"
+with open(os.path.join(os.path.dirname(__file__), "fixtures", "company_531802.html"),
+          encoding="utf-8") as f:
+    COMPANY_HTML = f.read()
+
+EXPECTED = {
+    "sales": [100.0, 104.0, 108.0, 112.0, 130.0],
+    "other_income": [2.0, 2.0, 3.0, 2.0, 2.0],
+    "opm_percent": ["20%", "21%", "21%", "21%", "25%"],
+    "net_profit": [12.0, 13.0, 14.0, 15.0, 20.0],
+    "borrowings": [50.0, 40.0],
+    "cash_from_ops": [35.0, 45.0],
+    "working_capital_days": [60.0, 65.0],
+    "marketcap": 1234.0,
+    "stock_pe": 18.5,
+    "industry_pe": 22.1,
+    "median_pe": None,
+    "promoters_last2": [55.1, 55.2],
+}
+
+
+@pytest.fixture
+def server(tmp_path):
+    Fixtures(str(tmp_path)).add(COMPANY_URL, 200, "text/html; charset=utf-8",
+                                COMPANY_HTML.encode("utf-8"))
+    with FixtureServer(str(tmp_path)) as server:
+        yield server
+
+
+def test_http_page_scraper_over_saved_page(server):
+    result = http_page_scraper(make_session(), server.base_url + "/company/531802/#quarters")
+    assert result == EXPECTED
+
+
+def test_html_payload_matches_browser_payload():
+    sync_api = pytest.importorskip("playwright.sync_api")
+    html_payload = payload_from_html(COMPANY_HTML)
+    with sync_api.sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(COMPANY_HTML)
+        browser_payload = extract_page_payload(page, HISTORY_SECTION_IDS)
+        browser.close()
+    assert parse_page_payload(html_payload, history=True) == parse_page_payload(
+        browser_payload, history=True)
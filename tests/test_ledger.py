@@ -0,0 +1,84 @@
+import pytest
+
+import sinks
+from ledger import RunLedger
+
+
+class BufferingSink(sinks.Sink):
+    def __init__(self, fail_flush=False, fail_write=False):
+        self.fail_flush, self.fail_write = fail_flush, fail_write
+        self.pending, self.stored = [], []
+
+    def write(self, record):
+        if self.fail_write:
+            raise RuntimeError("write failed")
+        self.pending.append(record)
+
+    def flush(self):
+        if self.fail_flush:
+            raise RuntimeError("flush failed")
+        self.stored.extend(self.pending)
+        self.pending = []
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    sink = BufferingSink()
+    monkeypatch.setattr(sinks, "_sinks", [sink])
+    return sink
+
+
+def test_written_companies_are_done_only_after_a_flush(tmp_path, sink):
+    ledger = RunLedger(str(tmp_path / "ledger.sqlite"))
+    ledger.mark_written("14 November", "531802")
+    assert ledger.done_codes("14 November") == set()
+    assert ledger.checkpoint() == 1
+    assert ledger.done_codes("14 November") == {"531802"}
+
+
+def test_failed_flush_keeps_companies_pending(tmp_path, sink):
+    ledger = RunLedger(str(tmp_path / "ledger.sqlite"))
+    sink.fail_flush = True
+    ledger.mark_written("14 November", "531802")
+    assert ledger.checkpoint() == 0
+    assert ledger.done_codes("14 November") == set()
+    sink.fail_flush = False
+    assert ledger.checkpoint() == 1
+
+
+def test_checkpoints_every_n_written(tmp_path, sink):
+    ledger = RunLedger(str(tmp_path / "ledger.sqlite"), checkpoint_every=2)
+    ledger.mark_written("14 November", "A")
+    ledger.mark_written("14 November", "B")
+    assert ledger.done_codes("14 November") == {"A", "B"}
+
+
+def test_write_record_reports_failing_sink(monkeypatch):
+    ok, broken = BufferingSink(), BufferingSink(fail_write=True)
+    monkeypatch.setattr(sinks, "_sinks", [ok, broken])
+    record = sinks.make_record("14 November", "531802", "ABC", {}, None)
+    with pytest.raises(sinks.SinkError):
+        sinks.write_record(record)
+    assert ok.pending == [record]
+
+
+def test_day_labels_are_keyed_by_iso_day(tmp_path, sink):
+    ledger = RunLedger(str(tmp_path / "ledger.sqlite"))
+    ledger.mark_done(" 14 November\n", "531802")
+    assert ledger.done_codes("14 November") == {"531802"}
+    day = sinks.trade_day_key("14 November")
+    assert ledger._conn.execute("SELECT trade_date FROM ledger").fetchall() == [(day,)]
+    jobs = [{"url": "u", "code": "531802", "trade_date": day}]
+    assert ledger.pending(jobs) == []
+
+
+def test_label_rows_of_older_ledgers_get_the_year_they_were_written(tmp_path, sink):
+    path = str(tmp_path / "ledger.sqlite")
+    ledger = RunLedger(path)
+    ledger._conn.execute(
+        "INSERT INTO ledger VALUES ('14 November', '531802', 'done', 1, NULL, '2024-11-14T18:00:00')"
+    )
+    ledger._conn.commit()
+    ledger.close()
+    ledger = RunLedger(path)
+    assert ledger.done_codes("2024-11-14") == {"531802"}
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("lxml")
+
+from listing import pagination_plan  # noqa: E402
+
+LISTING = "https://www.screener.in/results/latest/"
+QUERY = "result_update_date__day=14&result_update_date__month=11&result_update_date__year=2025"
+
+
+class FakeListingPage:
+    def __init__(self, links):
+        self.links = links
+
+    def evaluate(self, js, xpath):
+        return self.links
+
+
+def test_page_parameter_is_the_one_matching_every_link():
+    links = [{"text": "1", "url": f"{LISTING}?{QUERY}"}]
+    links += [{"text": str(n), "url": f"{LISTING}?p={n}&{QUERY}"} for n in (2, 3, 13, 14)]
+    links.append({"text": "Next", "url": f"{LISTING}?p=2&{QUERY}"})
+    last_page, page_url = pagination_plan(FakeListingPage(links))
+    assert last_page == 14
+    assert page_url(5) == f"{LISTING}?{QUERY}&p=5"
+
+
+def test_ambiguous_page_parameter_gives_no_urls():
+    links = [{"text": "14", "url": f"{LISTING}?p=14&{QUERY}"}]
+    assert pagination_plan(FakeListingPage(links)) == (14, None)
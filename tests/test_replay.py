@@ -0,0 +1,22 @@
+import json
+import os
+
+from replay import Fixtures
+
+
+def test_entries_are_journaled_until_saved(tmp_path):
+    root = str(tmp_path)
+    fixtures = Fixtures(root)
+    fixtures.add("https://www.screener.in/company/A/#top", 200, "text/html", b"A")
+    fixtures.add("https://www.screener.in/company/B/", 200, "text/html", b"B")
+    assert not os.path.exists(os.path.join(root, "manifest.json"))
+
+    # An interrupted recording is read back from the journal
+    assert Fixtures(root).lookup("https://www.screener.in/company/A/")[2] == b"A"
+
+    fixtures.save()
+    assert not os.path.exists(os.path.join(root, "manifest.jsonl"))
+    with open(os.path.join(root, "manifest.json")) as f:
+        assert sorted(json.load(f)) == ["https://www.screener.in/company/A/",
+                                        "https://www.screener.in/company/B/"]
+    assert Fixtures(root).lookup("/company/B/", any_host=True)[2] == b"B"
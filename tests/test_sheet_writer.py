@@ -0,0 +1,72 @@
+import sheet_writer
+from conftest import FakeWorksheet
+from sheet_writer import SheetWriter
+
+
+def row(date, name):
+    return [date, name] + [""] * 12
+
+
+def test_skips_rows_already_in_sheet(worksheet):
+    writer = SheetWriter(worksheet, batch_size=10)
+    assert writer.append(row("14 November", "  abc ltd ")) is False
+    assert writer.append(row("15 November", "ABC Ltd")) is True
+    assert writer.flush() == 1
+    assert worksheet.rows[-1][:2] == ["15 November", "ABC Ltd"]
+
+
+def test_skips_duplicates_still_pending(worksheet):
+    writer = SheetWriter(worksheet, batch_size=10)
+    assert writer.append(row("15 November", "XYZ")) is True
+    assert writer.append(row("15 November", "xyz")) is False
+    assert writer.flush() == 1
+
+
+def test_reads_existing_keys_once(worksheet):
+    writer = SheetWriter(worksheet, batch_size=10)
+    for i in range(5):
+        writer.append(row("15 November", f"Stock {i}"))
+    writer.flush()
+    writer.append(row("16 November", "Stock 0"))
+    assert worksheet.get_all_values_calls == 1
+
+
+def test_batches_rows_into_one_append(worksheet):
+    writer = SheetWriter(worksheet, batch_size=3)
+    writer.append(row("15 November", "A"))
+    writer.append(row("15 November", "B"))
+    assert worksheet.append_calls == []
+    writer.append(row("15 November", "C"))
+    assert [[r[1] for r in call] for call in worksheet.append_calls] == [["A", "B", "C"]]
+    assert writer.flush() == 0
+
+
+def test_flushes_rows_older_than_interval(worksheet, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sheet_writer.time, "monotonic", lambda: now[0])
+    writer = SheetWriter(worksheet, batch_size=50, flush_interval=30.0)
+    writer.append(row("15 November", "A"))
+    assert worksheet.append_calls == []
+    now[0] += 31
+    writer.append(row("15 November", "B"))
+    assert len(worksheet.append_calls) == 1
+    assert len(worksheet.append_calls[0]) == 2
+
+
+def test_close_flushes_pending_rows(worksheet):
+    with SheetWriter(worksheet, batch_size=50) as writer:
+        writer.append(row("15 November", "A"))
+    assert len(worksheet.append_calls) == 1
+
+
+def test_failed_append_keeps_rows_buffered():
+    sheet = FakeWorksheet(fail_appends=1)
+    writer = SheetWriter(sheet, batch_size=50)
+    writer.append(row("15 November", "A"))
+    try:
+        writer.flush()
+    except RuntimeError:
+        pass
+    assert sheet.rows == []
+    assert writer.flush() == 1
+    assert [r[1] for r in sheet.rows] == ["A"]
@@ -0,0 +1,59 @@
+import json
+import sqlite3
+from datetime import date
+
+import sinks
+
+
+def test_trade_day_is_the_latest_past_occurrence():
+    today = date(2026, 1, 10)
+    assert sinks.trade_day("14 November", today) == date(2025, 11, 14)
+    assert sinks.trade_day(" 10 January\n", today) == date(2026, 1, 10)
+    assert sinks.trade_day("29 February", today) == date(2024, 2, 29)
+    assert sinks.trade_day("2025-11-14", today) == date(2025, 11, 14)
+    assert sinks.trade_day("November", today) is None
+
+
+def test_same_day_label_in_two_years_keeps_both_rows(tmp_path):
+    sink = sinks.SQLiteSink(str(tmp_path / "results.sqlite"))
+    for day in ("2024-11-14", "2025-11-14"):
+        record = sinks.make_record("14 November", "531802", "ABC", {"sales": [1.0]}, None)
+        record["trade_day"] = day
+        sink.write(record)
+    sink.flush()
+    rows = sink._conn.execute(
+        "SELECT trade_day, trade_date FROM results ORDER BY trade_day"
+    ).fetchall()
+    assert rows == [("2024-11-14", "14 November"), ("2025-11-14", "14 November")]
+    sink.close()
+
+
+def test_old_store_is_rekeyed_on_open(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE results (trade_date TEXT, company_code TEXT, stock_name TEXT, "
+        "accepted INTEGER, result_type TEXT, valuation TEXT, classification TEXT, "
+        "result TEXT, scraped_at TEXT, PRIMARY KEY (trade_date, company_code))"
+    )
+    conn.execute(
+        "CREATE TABLE history (trade_date TEXT, company_code TEXT, section TEXT, label TEXT, "
+        "period_index INTEGER, period TEXT, value REAL, "
+        "PRIMARY KEY (trade_date, company_code, section, label, period_index))"
+    )
+    conn.execute("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                 ("14 November", "531802", "ABC", 0, None, None, None,
+                  json.dumps({}), "2024-11-14T18:00:00"))
+    conn.execute("INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?)",
+                 ("14 November", "531802", "profit-loss", "Sales", 0, "Mar 2024", 1.0))
+    conn.commit()
+    conn.close()
+
+    sink = sinks.SQLiteSink(path)
+    assert sink._conn.execute("SELECT trade_day, trade_date FROM results").fetchall() == [
+        ("2024-11-14", "14 November")
+    ]
+    assert sink._conn.execute("SELECT trade_day, value FROM history").fetchall() == [
+        ("2024-11-14", 1.0)
+    ]
+    sink.close()
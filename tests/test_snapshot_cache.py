@@ -0,0 +1,69 @@
+import pytest
+
+import snapshot_cache
+from snapshot_cache import SnapshotCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(snapshot_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = SnapshotCache(str(tmp_path), ttl=60)
+    cache.put("https://example.com/company/A/#top", "<html>A</html>")
+    clock[0] += 59
+    assert cache.get("https://example.com/company/A") == "<html>A</html>"
+    clock[0] += 2
+    assert cache.get("https://example.com/company/A/") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_over_the_size_cap(tmp_path, clock):
+    cache = SnapshotCache(str(tmp_path))
+    cache.put("a", "<html>" + "a" * 100 + "</html>")
+    size = cache.stats()["bytes"]
+    cache.max_bytes = 2 * size
+    clock[0] += 1
+    cache.put("b", "<html>" + "b" * 100 + "</html>")
+    clock[0] += 1
+    assert cache.get("a") is not None   # a is now more recent than b
+    clock[0] += 1
+    cache.put("c", "<html>" + "c" * 100 + "</html>")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_identical_pages_share_one_blob(tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    cache.put("a", "<html>same</html>")
+    cache.put("b", "<html>same</html>")
+    size = cache.stats()["bytes"] // 2
+    cache.max_bytes = size
+    cache.put("a", "<html>same</html>")
+    assert cache.get("a") == cache.get("b") == "<html>same</html>"
+
+
+def test_redirected_page_is_cached_under_its_final_url(tmp_path):
+    pytest.importorskip("requests")
+    from http_engine import fetch_company_html
+
+    class Redirected:
+        url = "https://example.com/company/NEW/"
+        text = "<html>NEW</html>"
+
+        def raise_for_status(self):
+            pass
+
+    class Session:
+        def get(self, url, timeout=None):
+            return Redirected()
+
+    cache = SnapshotCache(str(tmp_path))
+    assert fetch_company_html(Session(), "https://example.com/company/OLD/", cache=cache) \
+        == "<html>NEW</html>"
+    assert cache.get("https://example.com/company/OLD/") is None
+    assert cache.get("https://example.com/company/NEW/") == "<html>NEW</html>"
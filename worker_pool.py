@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+from playwright.sync_api import sync_playwright
+
+from browser_session import BrowserSession
+
+from results_scraper import company_code_from_url, results_page_scraper, write_outputs
+from sinks import flush_sinks
+from metrics import METRICS, span
+
+# Worker-pool mode: the day's company URLs are collected first, then scraped
+# through N concurrent browser pages. The sync Playwright API is bound to the
+# thread that started it, so every worker thread owns its own browser and a
+# context seeded from the persistent profile's storage state. All results go
+# through one writer thread, which is the only one touching the output sinks.
+
+_STOP = object()
+
+
+# ---------- Per-host rate limiting ----------
+
+class RateLimiter:
+    """Enforce a minimum interval between requests to the same host, across threads."""
+
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# ---------- Workers ----------
+
+def _scrape_worker(worker_id, jobs, results, limiter, storage_state, headless, bulk, cache,
+                   setup_context, recycle_after, history=False):
+    with sync_playwright() as p:
+        session = BrowserSession(
+            p,
+            storage_state=storage_state or {"cookies": [], "origins": []},
+            headless=headless,
+            setup_context=setup_context,
+            recycle_after=recycle_after,
+        ).start()
+        while True:
+            job = jobs.get()
+            if job is _STOP:
+                break
+            try:
+                limiter.wait(job["url"])
+                with session.page() as page:
+                    result = results_page_scraper(page, bulk=bulk, url=job["url"], cache=cache,
+                                                  history=history)
+                    # Sheet rows are named after the page title in every mode
+                    # (it is the (Date, Stock Name) dedup key), not the anchor text
+                    job = dict(job, name=page.title() or job["name"])
+                results.put((job, result, None))
+            except Exception as e:
+                METRICS.error("scrape", e, url=job["url"], worker=worker_id)
+                print(f"[worker {worker_id}] ⚠ failed {job['url']}: {e}")
+                results.put((job, None, e))
+        session.close()
+
+
+def _writer(results, accepted, errors, ledger=None):
+    while True:
+        item = results.get()
+        if item is _STOP:
+            with span("sink_flush"):
+                if ledger is not None:
+                    ledger.checkpoint()
+                else:
+                    flush_sinks()
+            break
+        job, result, error = item
+        code = company_code_from_url(job["url"])
+        if error is not None:
+            errors.append((job, error))
+            if ledger is not None:
+                ledger.mark_failed(job["trade_date"], code, error)
+            METRICS.stock_done(ok=False, url=job["url"], trade_date=job["trade_date"])
+            continue
+        try:
+            if write_outputs(result, job["name"], job["trade_date"], code):
+                accepted.append(job)
+            if ledger is not None:
+                ledger.mark_written(job["trade_date"], code)
+            METRICS.stock_done(ok=True, url=job["url"], trade_date=job["trade_date"])
+        except Exception as e:
+            METRICS.error("write", e, url=job["url"])
+            METRICS.stock_done(ok=False, url=job["url"], trade_date=job["trade_date"])
+            print(f"[writer] ⚠ failed to write {job['name']}: {e}")
+            errors.append((job, e))
+            if ledger is not None:
+                ledger.mark_failed(job["trade_date"], code, e)
+
+
+def scrape_with_pool(jobs, workers=4, min_interval=1.0, storage_state=None,
+                     headless=True, bulk=True, cache=None, setup_context=None, ledger=None,
+                     recycle_after=100, history=False):
+    """
+    Scrape `jobs` (dicts with "url", "name", "trade_date") through `workers`
+    concurrent browser pages, at most one request per `min_interval` seconds
+    per host. `storage_state` is a Playwright storage state (path or dict)
+    carrying the logged-in cookies, `cache` an optional SnapshotCache and
+    `setup_context(context)` an optional hook run on every worker context
+    (record/replay routes, resource blocking ...). With a ledger.RunLedger,
+    jobs already done for their trade date are skipped and every outcome is
+    recorded by the writer thread. Each worker's page is recycled after
+    `recycle_after` companies. history=True stores every period of each
+    company's tables along with the result (see results_page_scraper).
+
+    Returns (accepted_jobs, [(job, error), ...]).
+    """
+    if ledger is not None:
+        jobs = ledger.pending(jobs)
+    job_queue = queue.Queue()
+    for job in jobs:
+        job_queue.put(job)
+    for _ in range(workers):
+        job_queue.put(_STOP)
+
+    results = queue.Queue()
+    accepted, errors = [], []
+    limiter = RateLimiter(min_interval)
+
+    writer = threading.Thread(target=_writer, args=(results, accepted, errors, ledger))
+    writer.start()
+
+    threads = [
+        threading.Thread(
+            target=_scrape_worker,
+            args=(i, job_queue, results, limiter, storage_state, headless, bulk, cache,
+                  setup_context, recycle_after, history),
+        )
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    results.put(_STOP)
+    writer.join()
+
+    print(f"Pool done: {len(accepted)} accepted, {len(errors)} errors, {len(jobs)} jobs.")
+    return accepted, errors